@@ -0,0 +1,198 @@
+"""Leaderboard scale benchmark and synthetic data generator.
+
+Fills a scratch copy of the leaderboard schema with synthetic scores at each
+requested size and measures bulk fill and add_score throughput, top-N and
+page latency percentiles, and the database file size. Results are printed
+(or written) as JSON; pass --baseline to fail on regressions against an
+earlier run.
+
+    python bench_leaderboard.py --sizes 10000 100000 10000000 --output bench.json
+    python bench_leaderboard.py --baseline bench.json --tolerance 0.25
+
+The report is {"benchmark", "python", "results": [...]} with one result per
+size, keyed by "rows". Throughputs are *_per_s, latencies are p50/p95/p99/max
+in ms, and cache_consistent records TopScoresCache.verify. With --baseline,
+"regressions" lists every metric that moved the wrong way by more than
+--tolerance, a fraction of the baseline value, for sizes present in both
+reports. The 25% default sits above the run-to-run noise of sub-millisecond
+percentiles on a desktop while still catching a lost index or an extra
+fsync, each of which costs several times that.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from leaderboard import INSERT_SQL, LeaderboardStore
+
+DEFAULT_SIZES = (10000, 100000, 10000000)
+# Median completion time in seconds per difficulty for the synthetic runs
+DIFFICULTY_MEDIANS = {"easy": 40, "medium": 90, "hard": 200}
+FILL_BATCH = 100000
+
+# Metrics where larger is better; every other numeric metric is a latency or size
+HIGHER_IS_BETTER = {"fill_rows_per_s", "add_score_per_s", "add_scores_batch_per_s"}
+
+
+def generate_scores(count, seed=0, players=10000, difficulties=DIFFICULTY_MEDIANS):
+    """Yield count synthetic (player_name, difficulty, time) rows
+
+    Times are log-normally distributed around each difficulty's median, which
+    gives the long slow tail real Time Attack results have.
+    """
+    rng = random.Random(seed)
+    names = [f"player{i:05d}" for i in range(players)]
+    levels = list(difficulties.items())
+    for _ in range(count):
+        difficulty, median = rng.choice(levels)
+        yield rng.choice(names), difficulty, max(1, int(rng.lognormvariate(0, 0.6) * median))
+
+
+def fill(store, count, seed=0):
+    """Bulk-insert count synthetic rows; returns rows per second"""
+    conn = store.connection()
+    rows = generate_scores(count, seed)
+    start = time.perf_counter()
+    while True:
+        batch = list(itertools.islice(rows, FILL_BATCH))
+        if not batch:
+            break
+        with conn:
+            conn.executemany(INSERT_SQL, batch)
+    return count / (time.perf_counter() - start)
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "p50_ms": pick(0.50) * 1e3,
+        "p95_ms": pick(0.95) * 1e3,
+        "p99_ms": pick(0.99) * 1e3,
+        "max_ms": ordered[-1] * 1e3,
+    }
+
+
+def _timed(func, calls):
+    samples = []
+    for args in calls:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_size(path, size, queries=1000, inserts=1000, seed=0):
+    """Run every measurement against a fresh database of `size` rows"""
+    rng = random.Random(seed)
+    difficulties = list(DIFFICULTY_MEDIANS) + [None]
+    store = LeaderboardStore(path)
+    try:
+        store.setup()
+        result = {"rows": size, "fill_rows_per_s": fill(store, size, seed)}
+        store.connection().execute('ANALYZE leaderboard')
+
+        top_calls = [(5, rng.choice(difficulties)) for _ in range(queries)]
+        result["top5_uncached"] = percentiles(_timed(store.top_scores, top_calls))
+
+        max_time = max(DIFFICULTY_MEDIANS.values()) * 4
+        page_calls = [(rng.choice(difficulties), (rng.randrange(max_time), 0), 200) for _ in range(queries)]
+        result["page200_keyset"] = percentiles(_timed(store.page, page_calls))
+
+        start = time.perf_counter()
+        store.enable_top_cache()
+        result["top_cache_load_ms"] = (time.perf_counter() - start) * 1e3
+        result["top5_cached"] = percentiles(_timed(store.top_scores, top_calls))
+
+        new_rows = list(generate_scores(inserts, seed + 1))
+        start = time.perf_counter()
+        for row in new_rows:
+            store.add_score(*row)
+        result["add_score_per_s"] = inserts / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        store.add_scores(new_rows)
+        result["add_scores_batch_per_s"] = inserts / (time.perf_counter() - start)
+
+        store.connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        result["db_bytes"] = os.path.getsize(path)
+        result["cache_consistent"] = not store.top_cache.verify(store)
+    finally:
+        store.close()
+    return result
+
+
+def run(sizes=DEFAULT_SIZES, queries=1000, inserts=1000, seed=0, workdir=None):
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"bench_{size}.db")
+            results.append(bench_size(path, size, queries, inserts, seed))
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    return {"benchmark": "leaderboard", "python": sys.version.split()[0], "results": results}
+
+
+def _flatten(result, prefix=""):
+    for key, value in result.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key != "rows":
+            yield f"{prefix}{key}", value
+
+
+def compare(report, baseline, tolerance):
+    """List metrics that regressed by more than tolerance (a fraction) versus baseline"""
+    old = {r["rows"]: dict(_flatten(r)) for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        before = old.get(result["rows"])
+        if before is None:
+            continue
+        for name, value in _flatten(result):
+            if name not in before or not before[name]:
+                continue
+            change = (value - before[name]) / before[name]
+            if name.split('.')[0] in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append({"rows": result["rows"], "metric": name,
+                                    "baseline": before[name], "current": value})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the leaderboard at scale")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--queries', type=int, default=1000, help="Read queries per measurement")
+    parser.add_argument('--inserts', type=int, default=1000, help="Rows for the insert measurements")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help="Directory for the scratch databases")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="Earlier JSON report to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative slowdown before a metric counts as regressed")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.queries, args.inserts, args.seed, args.workdir)
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+        status = 1 if report["regressions"] else 0
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Load-test the leaderboard with simulated Time Attack players.
+
+Runs --bots concurrent asyncio bots. Each plays one TimeAttackSession after
+another until --sessions have been played in total. Before every answer a
+bot waits a random time (exponential, mean --latency seconds), and it
+answers wrong with probability --error-rate. Finished runs are scored
+through a ScoreWriter, the same path the GUI uses. A bot waits for its
+score to commit before starting its next run, so the write latency
+reported is submit to durable commit.
+
+Scores go to a scratch database unless --db names one. Set
+RSA_LEADERBOARD_SERVER to load-test a running leaderboard_server instead.
+
+    python bot_simulator.py --bots 2000 --sessions 20000 --latency 0.05 --error-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bench_leaderboard import percentiles
+from challenges import TIME_ATTACK_RANGES
+from leaderboard import SERVER_ENV, LeaderboardStore, ScoreWriter, default_store
+from time_attack import TimeAttackSession
+
+
+class SimulationStats:
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.started = 0
+        self.finished = 0
+        self.answers = 0
+        self.mistakes = 0
+        self.write_errors = 0
+        self.write_latencies = []
+
+    def claim(self):
+        """Reserve the next session; False once all have been handed out"""
+        if self.started >= self.sessions:
+            return False
+        self.started += 1
+        return True
+
+
+def _resolve(future, error):
+    if not future.done():
+        future.set_result(error)
+
+
+async def run_bot(bot_id, writer, stats, latency, error_rate, difficulties, rng):
+    loop = asyncio.get_running_loop()
+    name = f"bot{bot_id:05d}"
+    while stats.claim():
+        session = TimeAttackSession(name, rng.choice(difficulties))
+        while not session.finished:
+            await asyncio.sleep(rng.expovariate(1 / latency) if latency > 0 else 0)
+            answer = session.challenge.answers[session.question_index]
+            if rng.random() < error_rate:
+                answer += 1
+            session.submit(answer)
+            stats.answers += 1
+        stats.mistakes += session.mistakes
+
+        committed = loop.create_future()
+        submitted = time.perf_counter()
+        session.save_score(writer, lambda score, error: loop.call_soon_threadsafe(_resolve, committed, error))
+        error = await committed
+        stats.write_latencies.append(time.perf_counter() - submitted)
+        if error is not None:
+            stats.write_errors += 1
+        stats.finished += 1
+
+
+async def simulate(writer, bots=100, sessions=1000, latency=0.05, error_rate=0.1,
+                   difficulties=tuple(TIME_ATTACK_RANGES), seed=None):
+    """Play `sessions` runs across `bots` concurrent bots; returns a report dict"""
+    stats = SimulationStats(sessions)
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(run_bot(i, writer, stats, latency, error_rate, difficulties,
+                                   random.Random(rng.random()))
+                           for i in range(bots)))
+    duration = time.perf_counter() - start
+    report = {
+        "bots": bots,
+        "sessions": stats.finished,
+        "duration_s": duration,
+        "sessions_per_s": stats.finished / duration,
+        "answers_per_s": stats.answers / duration,
+        "mistakes": stats.mistakes,
+        "write_errors": stats.write_errors,
+    }
+    if stats.write_latencies:
+        report["write_latency"] = percentiles(stats.write_latencies)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate Time Attack players against the leaderboard")
+    parser.add_argument('--bots', type=int, default=1000, help="Concurrent players")
+    parser.add_argument('--sessions', type=int, default=10000, help="Games to play in total")
+    parser.add_argument('--latency', type=float, default=0.05, help="Mean seconds before each answer")
+    parser.add_argument('--error-rate', type=float, default=0.1, help="Chance each answer is wrong")
+    parser.add_argument('--difficulty', choices=sorted(TIME_ATTACK_RANGES),
+                        help="Only this difficulty (default: a random one per game)")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--db', help="Leaderboard database to write to (default: a scratch file)")
+    args = parser.parse_args(argv)
+    if not 0 <= args.error_rate < 1:
+        parser.error("--error-rate must be in [0, 1)")
+    difficulties = (args.difficulty,) if args.difficulty else tuple(TIME_ATTACK_RANGES)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        if args.db or not os.environ.get(SERVER_ENV):
+            store = LeaderboardStore(args.db or os.path.join(scratch, 'bots.db'))
+            target = store.path
+        else:
+            store = default_store()
+            target = os.environ[SERVER_ENV]
+        store.setup()
+        writer = ScoreWriter(store)
+        try:
+            report = asyncio.run(simulate(writer, args.bots, args.sessions, args.latency,
+                                          args.error_rate, difficulties, args.seed))
+        finally:
+            writer.close()
+            store.close()
+    report["target"] = target
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Procedural Time Attack challenges.
+
+A Challenge is a random small RSA key for one difficulty, with the three
+answers Time Attack asks for (n, e and d) worked out in advance. e is the
+smallest valid public exponent, which is the answer the e question expects.
+
+ChallengePool keeps a queue per difficulty that a background thread keeps
+topped up, so the game takes a fresh challenge in O(1). For offline use,
+generate_challenges and write_challenges produce challenges in bulk:
+
+    python challenges.py 1000000 challenges.jsonl [--difficulty hard] [--seed 7]
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
+from pools import BackgroundPool, shared
+from primes import primes_up_to
+from rsa_engine import coprime_exponents, mod_inverse
+
+# Prime ranges small enough to work the answers out by hand; each keeps the
+# fixed pair the game used to ask: (5, 7), (11, 13) and (17, 19)
+TIME_ATTACK_RANGES = {
+    "easy": (5, 13),
+    "medium": (11, 29),
+    "hard": (17, 59),
+}
+# Challenges kept ready per difficulty
+POOL_SIZE = 64
+
+CHALLENGE_FIELDS = ('difficulty', 'p', 'q', 'n', 'phi', 'e', 'd')
+
+_PRIMES = {difficulty: [p for p in primes_up_to(hi) if p >= lo]
+           for difficulty, (lo, hi) in TIME_ATTACK_RANGES.items()}
+
+
+class Challenge(namedtuple('Challenge', CHALLENGE_FIELDS)):
+    __slots__ = ()
+
+    @property
+    def answers(self):
+        """Correct answers to the three questions, in order"""
+        return self.n, self.e, self.d
+
+
+@lru_cache(maxsize=4096)
+def _challenge(difficulty, p, q):
+    n = p * q
+    phi = (p - 1) * (q - 1)
+    e = next(coprime_exponents(phi))
+    return Challenge(difficulty, p, q, n, phi, e, mod_inverse(e, phi))
+
+
+def make_challenge(difficulty, rng=None):
+    """A random challenge for difficulty"""
+    primes = _PRIMES.get(difficulty)
+    if primes is None:
+        raise ValueError(f"Unknown difficulty {difficulty!r}")
+    p, q = (rng or random).sample(primes, 2)
+    return _challenge(difficulty, p, q)
+
+
+def generate_challenges(count, difficulty=None, rng=None):
+    """Yield count random challenges, for one difficulty or (None) cycling through all"""
+    rng = rng or random.Random()
+    levels = itertools.repeat(difficulty) if difficulty else itertools.cycle(TIME_ATTACK_RANGES)
+    for level in itertools.islice(levels, count):
+        yield make_challenge(level, rng)
+
+
+def write_challenges(path, count, difficulty=None, seed=None):
+    """Write count challenges to a .csv or .jsonl file; the same seed gives the same file"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in ('.csv', '.jsonl', '.ndjson'):
+        raise ValueError(f"Unsupported challenge file type: {path} (use .csv or .jsonl)")
+    challenges = generate_challenges(count, difficulty, random.Random(seed))
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if ext == '.csv':
+            writer = csv.writer(f)
+            writer.writerow(CHALLENGE_FIELDS)
+            writer.writerows(challenges)
+        else:
+            f.writelines(json.dumps(c._asdict()) + '\n' for c in challenges)
+    return count
+
+
+class ChallengePool(BackgroundPool):
+    """Ready-made challenges per difficulty, refilled by a daemon thread
+
+    An empty queue falls back to making a challenge on the spot, which is
+    still only microseconds of work.
+    """
+
+    def __init__(self, difficulties=TIME_ATTACK_RANGES, size=POOL_SIZE, rng=None):
+        self.rng = rng or random.Random()
+        super().__init__(difficulties, size)
+
+    def make(self, difficulty):
+        return make_challenge(difficulty, self.rng)
+
+    def take(self, difficulty):
+        if difficulty not in self._queues:
+            raise ValueError(f"Unknown difficulty {difficulty!r}")
+        return super().take(difficulty)
+
+
+@shared
+def challenge_pool():
+    """Shared ChallengePool, started on first use"""
+    return ChallengePool()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Time Attack challenges in bulk")
+    parser.add_argument('count', type=int)
+    parser.add_argument('path', help="Output .csv or .jsonl file")
+    parser.add_argument('--difficulty', choices=sorted(TIME_ATTACK_RANGES),
+                        help="Only this difficulty (default: all, in turn)")
+    parser.add_argument('--seed', type=int, help="Seed for a reproducible set")
+    args = parser.parse_args(argv)
+    try:
+        write_challenges(args.path, args.count, args.difficulty, args.seed)
+    except (OSError, ValueError) as ex:
+        print(f"Error: {ex}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
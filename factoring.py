@@ -0,0 +1,341 @@
+"""Integer factoring for the "Break the key" stage.
+
+factorize() splits n with three tiers, cheapest first:
+
+1. Trial division over the cached small-prime table. With NumPy installed
+   the table is tested in one vectorised `n % table` for n below 2^63;
+   otherwise (and for bigger n) the table is grouped into blocks whose
+   products are gcd'd with n, so only blocks holding a factor are scanned.
+   Every key from the Easy/Medium/Hard ranges ends here.
+2. Fermat's method, which finds p and q almost at once when they are close
+   together (including n = p^2).
+3. Pollard's rho with Brent's cycle finding for everything else. Short runs
+   go inline; longer ones race one random walk per core on a process pool
+   until one splits n, the caller cancels, or the time budget runs out.
+
+A 64-bit n with two 32-bit primes takes well under a second. Real-size
+(Expert) keys are out of reach by design and end in FactoringTimeout.
+
+    python factoring.py            # benchmark each tier
+"""
+import math
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+try:
+    import numpy
+except ImportError:  # optional; the gcd path below needs nothing extra
+    numpy = None
+
+from pools import shared
+from primes import _PRIME_TABLE, is_prime, random_prime_bits
+from rsa_engine import mod_inverse
+from rsa_parallel import process_context
+
+# Seconds factorize() may spend before giving up
+DEFAULT_BUDGET = 10.0
+# Primes per product block on the gcd trial division path
+TRIAL_BLOCK = 64
+# Fermat steps tried before moving on to Pollard rho
+FERMAT_STEPS = 1 << 12
+# Rho steps between gcds (Brent's batching of |x - y| products)
+RHO_BATCH = 128
+# Rho steps tried inline before fanning out to the process pool
+INLINE_RHO_STEPS = 1 << 17
+# How often the parent checks for a result, a cancel or the deadline
+POLL_INTERVAL = 0.05
+
+TRIAL = 'trial division'
+FERMAT = 'fermat'
+RHO = 'pollard-brent'
+TIERS = (TRIAL, FERMAT, RHO)
+
+Factorization = namedtuple('Factorization', 'n factors tiers seconds')
+CrackedKey = namedtuple('CrackedKey', 'n e factors phi d tiers seconds')
+
+
+class FactoringTimeout(TimeoutError):
+    """Raised when n was not fully factored within the time budget"""
+
+    def __init__(self, n, budget, factors):
+        super().__init__(f"Could not factor a {n.bit_length()}-bit n within {budget:g} s")
+        self.factors = factors
+
+
+_TABLE = _PRIME_TABLE
+_BLOCKS = [(_TABLE[i:i + TRIAL_BLOCK], math.prod(_TABLE[i:i + TRIAL_BLOCK]))
+           for i in range(0, len(_TABLE), TRIAL_BLOCK)]
+_NP_TABLE = numpy.array(_TABLE, dtype=numpy.int64) if numpy is not None else None
+
+
+def _table_hits(n):
+    """Primes from the table that divide n"""
+    if _NP_TABLE is not None and n < 1 << 63:
+        return _NP_TABLE[n % _NP_TABLE == 0].tolist()
+    hits = []
+    for primes, product in _BLOCKS:
+        if math.gcd(n, product) > 1:
+            hits.extend(p for p in primes if n % p == 0)
+    return hits
+
+
+def trial_division(n):
+    """Split off every table prime dividing n; returns (factors, cofactor)"""
+    factors = []
+    for p in _table_hits(n):
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+    return factors, n
+
+
+def fermat(n, steps=FERMAT_STEPS):
+    """A factor of odd n from a^2 - n = b^2, or None within steps"""
+    a = math.isqrt(n)
+    if a * a < n:
+        a += 1
+    for _ in range(steps):
+        b2 = a * a - n
+        b = math.isqrt(b2)
+        if b * b == b2:
+            return a - b if a - b > 1 else None
+        a += 1
+    return None
+
+
+def pollard_brent(n, c=1, y=2, steps=None, stop=None):
+    """A nontrivial factor of composite n, or None
+
+    Walks x -> x^2 + c mod n from y. Gives up after about `steps` steps, or
+    when stop() returns true (checked once per RHO_BATCH steps). A walk that
+    closes its cycle without splitting n also returns None; retry with
+    another c.
+    """
+    if n % 2 == 0:
+        return 2
+    g = r = q = 1
+    x = ys = y
+    done = 0
+    while g == 1:
+        x = y
+        for _ in range(r):
+            y = (y * y + c) % n
+        k = 0
+        while k < r and g == 1:
+            ys = y
+            for _ in range(min(RHO_BATCH, r - k)):
+                y = (y * y + c) % n
+                q = q * abs(x - y) % n
+            g = math.gcd(q, n)
+            k += RHO_BATCH
+            if g == 1 and stop is not None and stop():
+                return None
+        done += 2 * r
+        r *= 2
+        if g == 1 and steps is not None and done >= steps:
+            return None
+    if g == n:
+        # The batch overshot; replay it one step at a time
+        while True:
+            ys = (ys * ys + c) % n
+            g = math.gcd(abs(x - ys), n)
+            if g > 1:
+                break
+    return g if g != n else None
+
+
+# Worker side of the parallel rho race. The parent bumps _generation when a
+# race ends, which stops the walks still running for it.
+_generation = None
+
+
+def _init_worker(generation):
+    global _generation
+    _generation = generation
+
+
+def _rho_walk(n, c, y, seconds, generation):
+    deadline = time.monotonic() + seconds
+    stop = lambda: _generation.value != generation or time.monotonic() > deadline
+    return pollard_brent(n, c, y, stop=stop)
+
+
+class RhoPool:
+    """Process pool racing Pollard-Brent walks with different constants
+
+    Races run one at a time; the shared generation counter is how the
+    parent tells workers that the race they belong to is over.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._context = process_context()
+        self._generation = self._context.RawValue('q', 0)
+        self._race = threading.Lock()
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context,
+                                             initializer=_init_worker, initargs=(self._generation,))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._generation.value += 1
+            self._pool.shutdown()
+            self._pool = None
+
+    def split(self, n, deadline, check=None, rng=random):
+        """A nontrivial factor of n, or None once deadline (time.monotonic) passes
+
+        check() is called every POLL_INTERVAL and may raise to abandon the race.
+        """
+        with self._race:
+            generation = self._generation.value
+            pending = set()
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    while len(pending) < self.workers:
+                        pending.add(self.pool.submit(_rho_walk, n, rng.randrange(1, n - 1),
+                                                     rng.randrange(2, n), remaining, generation))
+                    done, pending = wait(pending, timeout=min(POLL_INTERVAL, remaining),
+                                         return_when=FIRST_COMPLETED)
+                    for future in done:
+                        factor = future.result()
+                        if factor is not None:
+                            return factor
+                    if check is not None:
+                        check()
+            finally:
+                self._generation.value += 1
+
+
+@shared
+def rho_pool():
+    """Shared RhoPool; its processes start on the first parallel race"""
+    return RhoPool()
+
+
+def _split(n, deadline, check, pool, rng):
+    """(factor, tier) for composite n with no small factors, or None past deadline"""
+    factor = fermat(n)
+    if factor is not None:
+        return factor, FERMAT
+    if check is not None:
+        check()
+    factor = pollard_brent(n, rng.randrange(1, n - 1), rng.randrange(2, n), steps=INLINE_RHO_STEPS,
+                           stop=lambda: time.monotonic() > deadline)
+    if factor is None and time.monotonic() < deadline:
+        factor = (pool or rho_pool()).split(n, deadline, check, rng)
+    if factor is None:
+        return None
+    return factor, RHO
+
+
+def factorize(n, budget=DEFAULT_BUDGET, check=None, pool=None, rng=None):
+    """Prime factors of n (with multiplicity, ascending) and the tiers that found them
+
+    Raises FactoringTimeout when budget seconds pass first. check() is called
+    between steps and may raise to cancel.
+    """
+    if n < 2:
+        raise ValueError("n must be at least 2")
+    rng = rng or random.Random()
+    start = time.monotonic()
+    deadline = start + budget
+    factors, cofactor = trial_division(n)
+    tiers = [TRIAL] if factors else []
+    stack = [cofactor] if cofactor > 1 else []
+    while stack:
+        m = stack.pop()
+        if is_prime(m):
+            factors.append(m)
+            continue
+        found = _split(m, deadline, check, pool, rng)
+        if found is None:
+            raise FactoringTimeout(n, budget, sorted(factors))
+        factor, tier = found
+        if tier not in tiers:
+            tiers.append(tier)
+        stack += [factor, m // factor]
+    return Factorization(n, sorted(factors), tuple(tiers), time.monotonic() - start)
+
+
+def totient(factors):
+    """φ(n) from n's prime factors (with multiplicity)"""
+    phi = 1
+    for p in set(factors):
+        phi *= (p - 1) * p ** (factors.count(p) - 1)
+    return phi
+
+
+def crack_key(n, e, budget=DEFAULT_BUDGET, check=None):
+    """Recover the private exponent of the public key (n, e) by factoring n"""
+    result = factorize(n, budget, check)
+    if len(result.factors) < 2:
+        raise ValueError("n is prime, so it is not an RSA modulus")
+    phi = totient(result.factors)
+    d = mod_inverse(e, phi)
+    if d is None:
+        raise ValueError(f"e = {e} has no inverse mod φ(n); (n, e) is not a valid key")
+    return CrackedKey(n, e, result.factors, phi, d, result.tiers, result.seconds)
+
+
+def _semiprime(bits, rng):
+    return random_prime_bits(bits // 2, rng) * random_prime_bits(bits - bits // 2, rng)
+
+
+def _close_semiprime(bits, rng):
+    p = random_prime_bits(bits // 2, rng)
+    q = p + 2
+    while not is_prime(q):
+        q += 2
+    return p * q
+
+
+def _small_semiprime(bits, rng):
+    return rng.choice(_TABLE[len(_TABLE) // 2:]) * random_prime_bits(bits, rng)
+
+
+def benchmark_factoring(samples=20, rng=None):
+    """Mean and worst milliseconds per tier, each on n that tier is meant for
+
+    Returns {case: {'tier', 'bits', 'mean_ms', 'max_ms'}}; the trial division
+    cases are the game's own difficulty sizes.
+    """
+    rng = rng or random.Random(1)
+    cases = [
+        ("hard key (primes < 10^4)", TRIAL, lambda: rng.choice(_TABLE) * rng.choice(_TABLE)),
+        ("small factor x 64-bit prime", TRIAL, lambda: _small_semiprime(64, rng)),
+        ("close 128-bit primes", FERMAT, lambda: _close_semiprime(128, rng)),
+        ("48-bit semiprime", RHO, lambda: _semiprime(48, rng)),
+        ("64-bit semiprime", RHO, lambda: _semiprime(64, rng)),
+    ]
+    results = {}
+    for name, tier, make in cases:
+        times = []
+        for _ in range(samples):
+            n = make()
+            result = factorize(n, rng=rng)
+            times.append(result.seconds)
+        results[name] = {'tier': tier, 'bits': n.bit_length(),
+                         'mean_ms': sum(times) / len(times) * 1e3, 'max_ms': max(times) * 1e3}
+    return results
+
+
+if __name__ == "__main__":
+    print(f"trial division: {'numpy' if numpy is not None else 'gcd blocks'}, "
+          f"rho workers: {rho_pool().workers}")
+    for name, stats in benchmark_factoring().items():
+        print(f"{name:<30} {stats['tier']:<16} {stats['mean_ms']:10.3f} ms mean "
+              f"{stats['max_ms']:10.3f} ms max")
+    rho_pool().close()
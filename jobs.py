@@ -0,0 +1,281 @@
+"""Background jobs for the GUI's heavy crypto steps.
+
+A job is a plain function called as func(job, *args) on a QThreadPool
+thread. Long loops call job.progress(done, total), which also raises
+JobCancelled once the user has cancelled; job.map_chunks does both for
+chunk-wise work. Results, errors, progress and cancellation come back as Qt
+signals, delivered on the GUI thread.
+
+pow() holds the GIL for as long as it runs, which for real-size (Expert)
+moduli is tens to hundreds of milliseconds per call, long enough to stall
+the GUI. Those steps (private-key decryption, and prime checks and φ
+factoring for keys of PROCESS_KEY_BITS and up) run on the shared
+rsa_parallel engine's worker processes instead, with the pool thread only
+waiting for the results.
+"""
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from itertools import islice
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+import tracing
+from primes import PROCESS_KEY_BITS, is_prime, prime_pair_pool
+from rsa_engine import (RSAKey, CipherBuffer, decrypt_many, decode_blocks, decode_text,
+                        block_count, encode_text, iter_blocks, phi_factors, coprime_exponents,
+                        codebooks)
+
+# Values handed to the engine per step; small enough to cancel promptly
+JOB_CHUNK = 2048
+# Per step for real-size (above 64-bit) moduli, where one private-key
+# operation alone takes milliseconds
+BIG_KEY_CHUNK = 4
+# Fastest rate progress signals are sent at (seconds between updates)
+PROGRESS_INTERVAL = 1 / 30
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled"""
+
+
+class JobSignals(QObject):
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    progress = pyqtSignal(int, int)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+
+class Job(QRunnable):
+    """Runs func(job, *args) on a pool thread and reports through self.signals"""
+
+    def __init__(self, func, *args):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.signals = JobSignals()
+        self.cancelled = False
+        self._last_progress = 0.0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    def progress(self, done, total):
+        """Report progress (rate-limited) and stop here if cancelled"""
+        self.check()
+        now = time.monotonic()
+        if done >= total or now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.signals.progress.emit(done, total)
+
+    def map_chunks(self, func, values, chunk=JOB_CHUNK):
+        """func applied to values a chunk at a time, reporting progress between chunks"""
+        out = []
+        total = len(values)
+        for start in range(0, total, chunk):
+            out.extend(func(values[start:start + chunk]))
+            self.progress(min(start + chunk, total), total)
+        return out
+
+    def gather(self, results, total):
+        """Concatenate the lists results yields, reporting progress out of total"""
+        out = []
+        for values in results:
+            out.extend(values)
+            self.progress(len(out), total)
+        return out
+
+    def wait(self, future):
+        """The result of future, checking for cancellation while it is pending"""
+        while True:
+            try:
+                return future.result(timeout=PROGRESS_INTERVAL)
+            except FutureTimeout:
+                if self.cancelled:
+                    future.cancel()
+                    self.check()
+
+    def map_into(self, buffer, func, chunks):
+        """Write func(chunk) for each chunk into buffer in order, reporting progress"""
+        done = 0
+        total = len(buffer)
+        for values in chunks:
+            done = buffer.write(done, func(values))
+            self.progress(done, total)
+        return buffer
+
+    def run(self):
+        try:
+            self.check()
+            with tracing.profile_thread():
+                result = self.func(self, *self.args)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as ex:
+            self.signals.error.emit(ex)
+        else:
+            self.signals.result.emit(result)
+        self.signals.finished.emit()
+
+
+class JobRunner(QObject):
+    """Submits jobs to a thread pool and keeps them alive until they finish
+
+    Results of a job cancelled before its result was delivered are dropped,
+    so handlers never see stale work.
+    """
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.active = set()
+
+    def submit(self, func, *args, on_result=None, on_error=None, on_progress=None,
+               on_cancelled=None, on_finished=None):
+        job = Job(func, *args)
+        signals = job.signals
+        if on_result is not None:
+            signals.result.connect(lambda result: job.cancelled or on_result(result))
+        if on_error is not None:
+            signals.error.connect(lambda error: job.cancelled or on_error(error))
+        if on_progress is not None:
+            signals.progress.connect(on_progress)
+        if on_cancelled is not None:
+            signals.cancelled.connect(on_cancelled)
+        signals.finished.connect(lambda: self.active.discard(job))
+        if on_finished is not None:
+            signals.finished.connect(on_finished)
+        self.active.add(job)
+        self.pool.start(job)
+        return job
+
+    def cancel_all(self):
+        for job in list(self.active):
+            job.cancel()
+
+
+def _engine():
+    # Imported here: rsa_parallel brings in multiprocessing, which only
+    # Expert keys need
+    from rsa_parallel import default_engine
+    return default_engine()
+
+
+def _call(job, key_bits, func, *args):
+    """func(*args), in a worker process for keys of PROCESS_KEY_BITS and up"""
+    if key_bits < PROCESS_KEY_BITS:
+        return func(*args)
+    return job.wait(_engine().submit(func, *args))
+
+
+def primality_job(job, p, q):
+    """True when both p and q are prime"""
+    key_bits = (p * q).bit_length()
+    with tracing.span("prime_validation", bits=max(p, q).bit_length()) as span:
+        valid = _call(job, key_bits, is_prime, p)
+        if valid:
+            job.check()
+            valid = _call(job, key_bits, is_prime, q)
+        span.set(valid=valid)
+    return valid
+
+
+def prime_pair_job(job, key_bits):
+    """Two primes for a key_bits modulus, from the shared pool when one is ready"""
+    with tracing.span("prime_generation", bits=key_bits):
+        return prime_pair_pool().take(key_bits)
+
+
+def exponent_job(job, p, q, count=10, start=3):
+    """The first count public exponents from start up that are coprime to φ(p, q)"""
+    phi = (p - 1) * (q - 1)
+    with tracing.span("exponent_candidates", phi_bits=phi.bit_length()) as span:
+        factors, cofactor = _call(job, (p * q).bit_length(), phi_factors, p, q)
+        found = []
+        for e in islice(coprime_exponents(phi, factors, cofactor, start), count):
+            found.append(e)
+            job.progress(len(found), count)
+        span.set(found=len(found))
+    return found
+
+
+def _is_big(n):
+    return n.bit_length() > 64
+
+
+def _chunk_size(n):
+    return BIG_KEY_CHUNK if _is_big(n) else JOB_CHUNK
+
+
+def keygen_job(job, p, q, e):
+    with tracing.span("keygen", bits=(p * q).bit_length()):
+        return RSAKey(p, q, e)
+
+
+def encrypt_job(job, key, text, block_mode):
+    """Encrypt text per character (via the key's codebook) or block packed
+
+    The plaintext is encoded a chunk at a time and each encrypted chunk is
+    written straight into a preallocated CipherBuffer, so no full-length
+    list of ints is ever built.
+    """
+    chunk = _chunk_size(key.n)
+    with tracing.span("encrypt", chars=len(text), block_mode=block_mode):
+        if block_mode:
+            data = text.encode('utf-8')
+            ciphertext = job.map_into(CipherBuffer.allocate(key.n, block_count(len(data), key.n)),
+                                      key.encrypt_many, iter_blocks(data, key.n, chunk))
+        else:
+            chunks = (encode_text(text[i:i + chunk]) for i in range(0, len(text), chunk))
+            ciphertext = job.map_into(CipherBuffer.allocate(key.n, len(text)),
+                                      key.codebook.encrypt_many, chunks)
+    tracing.count("encrypt.values", len(ciphertext))
+    return ciphertext
+
+
+def _decrypt_in_processes(job, key, ciphertext, d, block_mode):
+    # Per character, each distinct value is decrypted once, as a codebook would
+    values = ciphertext if block_mode else list(dict.fromkeys(ciphertext))
+    chunk = _chunk_size(key.n)
+    chunks = (values[i:i + chunk] for i in range(0, len(values), chunk))
+    plain = job.gather(_engine().decrypt_chunks(key, chunks, d), len(values))
+    if block_mode:
+        return decode_blocks(plain, key.n)
+    table = dict(zip(values, plain))
+    return decode_text([table[c] for c in ciphertext])
+
+
+def decrypt_job(job, key, ciphertext, d, block_mode):
+    """Decrypt with d, using the key's CRT path when d is the key's own
+
+    Real-size keys decrypt on worker processes.
+    """
+    with tracing.span("decrypt", values=len(ciphertext), block_mode=block_mode, crt=d == key.d):
+        if _is_big(key.n):
+            return _decrypt_in_processes(job, key, ciphertext, d, block_mode)
+        if block_mode:
+            if d == key.d:
+                decrypt = key.decrypt_many
+            else:
+                decrypt = lambda values: decrypt_many(values, d, key.n)
+            return decode_blocks(job.map_chunks(decrypt, ciphertext, _chunk_size(key.n)), key.n)
+        if d == key.d:
+            book = key.codebook
+        else:
+            book = codebooks.get(key.n, d=d)
+        return decode_text(job.map_chunks(book.decrypt_many, ciphertext, _chunk_size(key.n)))
+
+
+def crack_job(job, n, e, budget):
+    """Factor n to recover the private exponent for (n, e) within budget seconds"""
+    # Imported here: factoring brings in multiprocessing, which the game
+    # shouldn't pay for at startup
+    from factoring import crack_key
+    with tracing.span("crack", bits=n.bit_length()) as span:
+        cracked = crack_key(n, e, budget, check=job.check)
+        span.set(tiers=cracked.tiers)
+    return cracked
@@ -0,0 +1,533 @@
+"""SQLite-backed Time Attack leaderboard.
+
+LeaderboardStore keeps one long-lived connection per thread in WAL mode
+instead of opening and closing the database for every score. The module
+level setup_database/add_score/get_top_scores functions go through a shared
+default store. ScoreWriter moves score inserts onto a background thread that
+group-commits them, and TopScoresCache answers top-N reads from memory.
+
+Run as a script for maintenance:
+
+    python leaderboard.py export scores.csv|scores.jsonl
+    python leaderboard.py import scores.csv|scores.jsonl
+    python leaderboard.py merge other_game_leaderboard.db
+    python leaderboard.py compact --keep 3
+"""
+import argparse
+import atexit
+import csv
+import heapq
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+
+import tracing
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game_leaderboard.db')
+# "host:port" of a leaderboard_server to use instead of the local database
+SERVER_ENV = 'RSA_LEADERBOARD_SERVER'
+# Seconds the game waits on that server before giving up on a request
+SERVER_TIMEOUT = 2.0
+
+CREATE_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS leaderboard (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    player_name TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    time INTEGER NOT NULL
+)'''
+
+# Schema migrations, applied in order; PRAGMA user_version records the last one run
+MIGRATIONS = [
+    (1, [
+        'CREATE INDEX IF NOT EXISTS idx_leaderboard_difficulty_time ON leaderboard (difficulty, time)',
+        'CREATE INDEX IF NOT EXISTS idx_leaderboard_time ON leaderboard (time)',
+    ]),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+INSERT_SQL = 'INSERT INTO leaderboard (player_name, difficulty, time) VALUES (?, ?, ?)'
+TOP_SQL = 'SELECT player_name, difficulty, time FROM leaderboard ORDER BY time ASC LIMIT ?'
+TOP_BY_DIFFICULTY_SQL = '''
+SELECT player_name, difficulty, time FROM leaderboard
+WHERE difficulty = ?
+ORDER BY time ASC
+LIMIT ?'''
+
+# Keyset pagination: rows come back ordered by (time, id) and the caller passes
+# the last (time, id) it has seen, so every page is an index seek
+PAGE_SQL = '''
+SELECT id, player_name, difficulty, time FROM leaderboard
+WHERE (time, id) > (?, ?)
+ORDER BY time, id
+LIMIT ?'''
+PAGE_BY_DIFFICULTY_SQL = '''
+SELECT id, player_name, difficulty, time FROM leaderboard
+WHERE difficulty = ? AND (time, id) > (?, ?)
+ORDER BY time, id
+LIMIT ?'''
+COUNT_SQL = 'SELECT COUNT(*) FROM leaderboard'
+COUNT_BY_DIFFICULTY_SQL = 'SELECT COUNT(*) FROM leaderboard WHERE difficulty = ?'
+DIFFICULTIES_SQL = 'SELECT DISTINCT difficulty FROM leaderboard'
+EXPORT_SQL = 'SELECT player_name, difficulty, time FROM leaderboard ORDER BY id'
+MERGE_SQL = '''
+INSERT INTO leaderboard (player_name, difficulty, time)
+SELECT player_name, difficulty, time FROM other.leaderboard ORDER BY id'''
+# Retention: keep each player's best K runs per difficulty
+COMPACT_SQL = '''
+DELETE FROM leaderboard WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY player_name, difficulty ORDER BY time, id
+        ) AS rank
+        FROM leaderboard
+    ) WHERE rank > ?
+)'''
+
+EXPORT_COLUMNS = ('player_name', 'difficulty', 'time')
+# Rows per executemany/transaction for bulk imports and per fetch for exports
+BULK_BATCH = 100000
+
+# Rows per difficulty kept in memory by TopScoresCache
+TOP_CACHE_SIZE = 200
+
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',    # WAL keeps the database consistent; only the last commits may roll back on power loss
+    'PRAGMA cache_size=-8192',      # 8 MiB page cache
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000',
+)
+
+
+class TopScoresCache:
+    """Bounded in-memory top-N per difficulty (plus overall), updated on insert
+
+    Each difficulty keeps a heap of its N best (time, id) rows with the worst
+    one on top, so an insert is at most one heap replacement. Rows are the
+    same (id, player_name, difficulty, time) tuples LeaderboardStore.page
+    returns.
+    """
+
+    def __init__(self, size=TOP_CACHE_SIZE):
+        self.size = size
+        self._heaps = {}
+        self._sorted = {}
+        self._lock = threading.Lock()
+
+    def load(self, store):
+        """Replace the cache contents with the current top rows in the database"""
+        conn = store.connection()
+        heaps = {None: [self._entry(row) for row in store.page(None, None, self.size, use_cache=False)]}
+        for (difficulty,) in conn.execute(DIFFICULTIES_SQL).fetchall():
+            rows = store.page(difficulty, None, self.size, use_cache=False)
+            heaps[difficulty] = [self._entry(row) for row in rows]
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        with self._lock:
+            self._heaps = heaps
+            self._sorted = {}
+
+    @staticmethod
+    def _entry(row):
+        # Negated (time, id) turns heapq's min-heap into a max-heap on the ranking key
+        return (-row[3], -row[0], row)
+
+    def add(self, rows):
+        """Record freshly inserted (id, player_name, difficulty, time) rows"""
+        with self._lock:
+            for row in rows:
+                for key in (None, row[2]):
+                    heap = self._heaps.setdefault(key, [])
+                    entry = self._entry(row)
+                    if len(heap) < self.size:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+                    else:
+                        continue
+                    self._sorted.pop(key, None)
+
+    def top(self, difficulty=None, limit=None):
+        """Cached rows for difficulty (None for all), fastest first"""
+        with self._lock:
+            rows = self._sorted.get(difficulty)
+            if rows is None:
+                heap = self._heaps.get(difficulty, [])
+                rows = self._sorted[difficulty] = [entry[2] for entry in sorted(heap, reverse=True)]
+        return rows[:limit] if limit is not None else list(rows)
+
+    def covers(self, limit):
+        return limit <= self.size
+
+    def verify(self, store):
+        """Compare every cached ranking with the database; returns the keys that differ"""
+        with self._lock:
+            keys = list(self._heaps)
+        mismatched = []
+        for key in keys:
+            if self.top(key) != store.page(key, None, self.size, use_cache=False):
+                mismatched.append(key)
+        return mismatched
+
+
+class LeaderboardStore:
+    """Leaderboard database with one tuned connection per thread"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self.top_cache = None
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Statements are compiled once and reused from the connection's cache
+            conn = sqlite3.connect(self.path, cached_statements=256, check_same_thread=False)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def setup(self):
+        """Create the table and bring the schema up to SCHEMA_VERSION"""
+        conn = self.connection()
+        with conn:
+            conn.execute(CREATE_TABLE_SQL)
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for target, statements in MIGRATIONS:
+                if target > version:
+                    for statement in statements:
+                        conn.execute(statement)
+                    conn.execute(f'PRAGMA user_version={target:d}')
+        if version < SCHEMA_VERSION:
+            conn.execute('ANALYZE leaderboard')
+
+    def durable_writes(self):
+        """Make commits on the calling thread's connection fsync (synchronous=FULL)"""
+        self.connection().execute('PRAGMA synchronous=FULL')
+
+    def enable_top_cache(self, size=TOP_CACHE_SIZE):
+        """Serve top-N reads and first pages from an in-memory TopScoresCache"""
+        cache = TopScoresCache(size)
+        cache.load(self)
+        self.top_cache = cache
+        return cache
+
+    def add_score(self, player_name, difficulty, time_taken):
+        self.add_scores([(player_name, difficulty, time_taken)])
+
+    def add_scores(self, scores):
+        """Insert many (player_name, difficulty, time) rows in one transaction"""
+        scores = list(scores)
+        conn = self.connection()
+        with conn:
+            conn.executemany(INSERT_SQL, scores)
+            # Rows inserted in one write transaction get consecutive AUTOINCREMENT ids
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        if self.top_cache is not None and scores:
+            first_id = last_id - len(scores) + 1
+            self.top_cache.add((first_id + i,) + tuple(score) for i, score in enumerate(scores))
+
+    def top_scores(self, limit=5, difficulty=None):
+        """Fastest runs overall, or for one difficulty"""
+        if self.top_cache is not None and self.top_cache.covers(limit):
+            return [row[1:] for row in self.top_cache.top(difficulty, limit)]
+        conn = self.connection()
+        if difficulty is None:
+            return conn.execute(TOP_SQL, (limit,)).fetchall()
+        return conn.execute(TOP_BY_DIFFICULTY_SQL, (difficulty, limit)).fetchall()
+
+    def page(self, difficulty=None, after=None, limit=100, use_cache=True):
+        """Return up to limit (id, player_name, difficulty, time) rows after the key `after`
+
+        `after` is the (time, id) of the last row of the previous page, or None
+        for the first page, which comes from the top cache when it is enabled.
+        """
+        if use_cache and after is None and self.top_cache is not None and self.top_cache.covers(limit):
+            return self.top_cache.top(difficulty, limit)
+        last_time, last_id = after if after is not None else (-1 << 63, -1 << 63)
+        conn = self.connection()
+        if difficulty is None:
+            return conn.execute(PAGE_SQL, (last_time, last_id, limit)).fetchall()
+        return conn.execute(PAGE_BY_DIFFICULTY_SQL, (difficulty, last_time, last_id, limit)).fetchall()
+
+    def _refresh_cache(self):
+        if self.top_cache is not None:
+            self.top_cache.load(self)
+
+    def export_file(self, path):
+        """Stream every score to a .csv or .jsonl file; returns the row count"""
+        fmt = _file_format(path)
+        cursor = self.connection().execute(EXPORT_SQL)
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            if fmt == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(EXPORT_COLUMNS)
+            while True:
+                rows = cursor.fetchmany(BULK_BATCH)
+                if not rows:
+                    break
+                if fmt == 'csv':
+                    writer.writerows(rows)
+                else:
+                    f.writelines(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in rows)
+                count += len(rows)
+        return count
+
+    def import_file(self, path):
+        """Bulk-load scores from a .csv or .jsonl file; returns the row count
+
+        The file is read and inserted BULK_BATCH rows at a time, all in one
+        transaction: a malformed record anywhere raises ValueError naming it
+        and leaves the leaderboard unchanged, so the import can simply be
+        run again once the file is fixed.
+        """
+        fmt = _file_format(path)
+        count = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            if fmt == 'csv':
+                rows = _score_rows(path, csv.DictReader(f))
+            else:
+                rows = _score_rows(path, filter(str.strip, f), json.loads)
+            conn = self.connection()
+            with conn:
+                while True:
+                    batch = list(itertools.islice(rows, BULK_BATCH))
+                    if not batch:
+                        break
+                    conn.executemany(INSERT_SQL, batch)
+                    count += len(batch)
+        self._refresh_cache()
+        return count
+
+    def merge_database(self, other_path):
+        """Append every score from another leaderboard database file"""
+        conn = self.connection()
+        conn.execute('ATTACH DATABASE ? AS other', (other_path,))
+        try:
+            with conn:
+                count = conn.execute(MERGE_SQL).rowcount
+        finally:
+            conn.execute('DETACH DATABASE other')
+        self._refresh_cache()
+        return count
+
+    def compact(self, keep=3):
+        """Keep each player's best `keep` runs per difficulty, then VACUUM and ANALYZE
+
+        Returns the number of rows deleted. keep must be at least 1; 0 would
+        empty the leaderboard.
+        """
+        if keep < 1:
+            raise ValueError(f"keep must be at least 1, not {keep}")
+        conn = self.connection()
+        with conn:
+            deleted = conn.execute(COMPACT_SQL, (keep,)).rowcount
+        conn.execute('VACUUM')
+        conn.execute('ANALYZE leaderboard')
+        self._refresh_cache()
+        return deleted
+
+    def count(self, difficulty=None):
+        conn = self.connection()
+        if difficulty is None:
+            return conn.execute(COUNT_SQL).fetchone()[0]
+        return conn.execute(COUNT_BY_DIFFICULTY_SQL, (difficulty,)).fetchone()[0]
+
+    def close(self):
+        """Close every connection this store has opened"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+class ScoreWriter:
+    """Background thread that group-commits submitted scores
+
+    submit() only enqueues, so callers never wait on disk. The writer takes
+    everything queued (up to batch_size rows), inserts it in one transaction
+    with synchronous=FULL and then calls each score's callback with
+    (score, error), error being None once the row is durable. The queue is
+    bounded, so a stalled disk applies backpressure instead of growing memory.
+    """
+
+    _STOP = object()
+
+    def __init__(self, store=None, maxsize=10000, batch_size=500):
+        self.store = store or default_store()
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='ScoreWriter', daemon=True)
+        self._thread.start()
+
+    def submit(self, player_name, difficulty, time_taken, callback=None):
+        if self._closed:
+            raise RuntimeError("ScoreWriter is closed")
+        self._queue.put(((player_name, difficulty, time_taken), callback))
+
+    def flush(self):
+        """Block until every score submitted so far has been committed"""
+        self._queue.join()
+
+    def close(self, timeout=None):
+        """Commit everything still queued, then stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((self._STOP, None))
+        self._thread.join(timeout)
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1][0] is not self._STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        self.store.durable_writes()
+        running = True
+        while running:
+            batch = self._take_batch()
+            if batch[-1][0] is self._STOP:
+                running = False
+            items = [item for item in batch if item[0] is not self._STOP]
+            error = None
+            try:
+                with tracing.span("leaderboard.commit", rows=len(items)):
+                    self.store.add_scores(score for score, _ in items)
+            except Exception as ex:  # sqlite3.Error, or a socket/server error for a remote store
+                error = ex
+            for score, callback in items:
+                if callback is not None:
+                    try:
+                        callback(score, error)
+                    except Exception as ex:
+                        print(f"ScoreWriter callback failed: {ex}", file=sys.stderr)
+            for _ in batch:
+                self._queue.task_done()
+
+
+_default_store = None
+_default_writer = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """The shared store: local SQLite, or a LeaderboardClient when SERVER_ENV is set"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            server = os.environ.get(SERVER_ENV)
+            if server:
+                from leaderboard_server import LeaderboardClient
+                host, _, port = server.rpartition(':')
+                _default_store = LeaderboardClient(host or '127.0.0.1', int(port), SERVER_TIMEOUT)
+            else:
+                _default_store = LeaderboardStore()
+        return _default_store
+
+
+# Setup SQLite database
+def setup_database():
+    """Prepare the shared store; cheap to call again once it is ready"""
+    store = default_store()
+    if store.top_cache is None:
+        store.setup()
+        store.enable_top_cache()
+
+
+def score_writer():
+    """Shared ScoreWriter, drained automatically at interpreter exit"""
+    global _default_writer
+    store = default_store()
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = ScoreWriter(store)
+            atexit.register(_default_writer.close)
+        return _default_writer
+
+
+def add_score(player_name, difficulty, time_taken):
+    default_store().add_score(player_name, difficulty, time_taken)
+
+
+def get_top_scores(difficulty=None, limit=5):
+    return default_store().top_scores(limit, difficulty)
+
+
+def _score_rows(path, records, parse=None):
+    """(player_name, difficulty, time) for each record, naming the first bad one"""
+    for number, record in enumerate(records, 1):
+        try:
+            if parse is not None:
+                record = parse(record)
+            row = record['player_name'], record['difficulty'], int(record['time'])
+        except (KeyError, TypeError, ValueError) as ex:
+            raise ValueError(f"{path}: record {number} is malformed ({ex!r}); "
+                             f"nothing was imported") from None
+        yield row
+
+
+def _file_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if ext == '.json':
+        # A .json file is usually one array, which line-by-line reading can't parse
+        raise ValueError(f"{path}: scores are exchanged as JSON Lines, one object per line; "
+                         f"rename the file to .jsonl if that is what it holds")
+    raise ValueError(f"Unsupported leaderboard file type: {path} (use .csv or .jsonl)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Leaderboard maintenance")
+    parser.add_argument('--db', default=DB_PATH, help="Leaderboard database file")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('export', help="Export scores to CSV/JSONL").add_argument('path')
+    sub.add_parser('import', help="Import scores from CSV/JSONL").add_argument('path')
+    sub.add_parser('merge', help="Merge another game_leaderboard.db").add_argument('path')
+    compact = sub.add_parser('compact', help="Keep each player's best runs, then VACUUM")
+    compact.add_argument('--keep', type=int, default=3, help="Runs kept per player and difficulty")
+    args = parser.parse_args(argv)
+    if args.command == 'compact' and args.keep < 1:
+        parser.error("--keep must be at least 1")
+
+    store = LeaderboardStore(args.db)
+    try:
+        store.setup()
+        if args.command == 'export':
+            print(f"Exported {store.export_file(args.path)} scores")
+        elif args.command == 'import':
+            print(f"Imported {store.import_file(args.path)} scores")
+        elif args.command == 'merge':
+            print(f"Merged {store.merge_database(args.path)} scores")
+        else:
+            print(f"Removed {store.compact(args.keep)} scores")
+    except (OSError, ValueError, KeyError, sqlite3.Error) as ex:
+        print(f"Error: {ex}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
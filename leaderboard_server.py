@@ -0,0 +1,277 @@
+"""Local asyncio leaderboard service shared by many game clients.
+
+The server speaks newline-delimited JSON over TCP on localhost. Each request
+is one object with an "op" and an optional "id" that is echoed back:
+
+    {"op": "submit", "player_name": "neo", "difficulty": "easy", "time": 42}
+    {"op": "top", "difficulty": "easy", "limit": 5}
+    {"op": "page", "difficulty": null, "after": [42, 17], "limit": 200}
+
+and every response is {"ok": true, ...} or {"ok": false, "error": "..."}.
+Submissions are funnelled through one writer task that group-commits them,
+and a submit is only acknowledged once its row is committed.
+
+    python leaderboard_server.py [--port 8765] [--db game_leaderboard.db]
+
+Point the game at it with RSA_LEADERBOARD_SERVER=127.0.0.1:8765.
+"""
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import threading
+
+from leaderboard import DB_PATH, LeaderboardStore
+
+HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Most submissions committed in one transaction
+WRITE_BATCH = 1000
+# Most requests in flight per client connection
+MAX_PIPELINE = 10000
+# Submissions LeaderboardClient.add_scores sends per round trip
+CLIENT_PIPELINE = 1000
+
+
+class LeaderboardServer:
+    """asyncio front end for a LeaderboardStore"""
+
+    def __init__(self, store, port=DEFAULT_PORT):
+        self.store = store
+        self.port = port
+        self._server = None
+        self._writes = None
+        self._writer_task = None
+        self._clients = set()
+
+    async def start(self):
+        self._writes = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._handle_client, HOST, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting, drop open connections, then finish queued writes"""
+        self._server.close()
+        for task in list(self._clients):
+            task.cancel()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        await self._server.wait_closed()
+        await self._writes.join()
+        self._writer_task.cancel()
+        await asyncio.gather(self._writer_task, return_exceptions=True)
+
+    async def _write_loop(self):
+        while True:
+            batch = [await self._writes.get()]
+            while len(batch) < WRITE_BATCH and not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            try:
+                await asyncio.to_thread(self.store.add_scores, [score for score, _ in batch])
+            except Exception as ex:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(ex)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+            for _ in batch:
+                self._writes.task_done()
+
+    async def _handle_client(self, reader, writer):
+        # Each request runs as its own task so pipelined submits share a
+        # commit batch; replies are still written in request order
+        task = asyncio.current_task()
+        self._clients.add(task)
+        pending = asyncio.Queue(MAX_PIPELINE)
+        sender = asyncio.create_task(self._send_replies(pending, writer))
+        try:
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    await pending.put(asyncio.create_task(self._dispatch(line)))
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            await pending.put(None)
+            await sender
+        except asyncio.CancelledError:
+            # close() is shutting down. Finish quietly: asyncio's stream
+            # callback reports a handler that ends cancelled as an error
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+        finally:
+            writer.close()
+            self._clients.discard(task)
+
+    async def _send_replies(self, pending, writer):
+        try:
+            while True:
+                task = await pending.get()
+                if task is None:
+                    return
+                response = await task
+                try:
+                    writer.write(json.dumps(response).encode() + b'\n')
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+        except asyncio.CancelledError:
+            while not pending.empty():
+                task = pending.get_nowait()
+                if task is not None:
+                    task.cancel()
+            raise
+
+    async def _dispatch(self, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request.get('op')
+            if op == 'submit':
+                score = (str(request['player_name']), str(request['difficulty']), int(request['time']))
+                future = asyncio.get_running_loop().create_future()
+                await self._writes.put((score, future))
+                await future
+                response = {'ok': True}
+            elif op == 'top':
+                limit = int(request.get('limit', 5))
+                args = (limit, request.get('difficulty'))
+                if self._cached(limit):
+                    scores = self.store.top_scores(*args)
+                else:
+                    scores = await asyncio.to_thread(self.store.top_scores, *args)
+                response = {'ok': True, 'scores': scores}
+            elif op == 'page':
+                limit = int(request.get('limit', 100))
+                after = tuple(request['after']) if request.get('after') else None
+                args = (request.get('difficulty'), after, limit)
+                if after is None and self._cached(limit):
+                    rows = self.store.page(*args)
+                else:
+                    rows = await asyncio.to_thread(self.store.page, *args)
+                response = {'ok': True, 'rows': rows}
+            else:
+                raise ValueError(f"Unknown op {op!r}")
+        except Exception as ex:
+            response = {'ok': False, 'error': str(ex)}
+        if request_id is not None:
+            response['id'] = request_id
+        return response
+
+    def _cached(self, limit):
+        """True when the top cache can answer without touching the database"""
+        cache = self.store.top_cache
+        return cache is not None and cache.covers(limit)
+
+
+class LeaderboardClient:
+    """Blocking client exposing the LeaderboardStore methods the game uses
+
+    One persistent connection is shared (under a lock) by all threads.
+    add_scores pipelines its submissions, CLIENT_PIPELINE per round trip.
+    """
+
+    def __init__(self, host=HOST, port=DEFAULT_PORT, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.top_cache = None
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        if self._sock is None:
+            self._sock = socket.create_connection((self.host, self.port), self.timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._file = self._sock.makefile('rwb')
+
+    def _call_many(self, requests):
+        with self._lock:
+            self._connect()
+            try:
+                self._file.write(b''.join(json.dumps(r).encode() + b'\n' for r in requests))
+                self._file.flush()
+                responses = [json.loads(self._file.readline()) for _ in requests]
+            except (OSError, ValueError):
+                self.close()
+                raise
+        for response in responses:
+            if not response.get('ok'):
+                raise RuntimeError(response.get('error', 'leaderboard server error'))
+        return responses
+
+    def _call(self, **request):
+        return self._call_many([request])[0]
+
+    def setup(self):
+        """The server owns the schema; nothing to do"""
+
+    def enable_top_cache(self, size=None):
+        """The server keeps the cache; nothing to do"""
+
+    def durable_writes(self):
+        """Submits are acknowledged after commit already"""
+
+    def add_score(self, player_name, difficulty, time_taken):
+        self._call(op='submit', player_name=player_name, difficulty=difficulty, time=time_taken)
+
+    def add_scores(self, scores):
+        requests = [{'op': 'submit', 'player_name': name, 'difficulty': difficulty, 'time': t}
+                    for name, difficulty, t in scores]
+        # Bounded round trips, so neither side's socket buffer can fill up
+        # while the other is still writing
+        for i in range(0, len(requests), CLIENT_PIPELINE):
+            self._call_many(requests[i:i + CLIENT_PIPELINE])
+
+    def top_scores(self, limit=5, difficulty=None):
+        return [tuple(row) for row in self._call(op='top', limit=limit, difficulty=difficulty)['scores']]
+
+    def page(self, difficulty=None, after=None, limit=100):
+        rows = self._call(op='page', difficulty=difficulty, after=after, limit=limit)['rows']
+        return [tuple(row) for row in rows]
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+
+async def run_server(db_path=DB_PATH, port=DEFAULT_PORT):
+    store = LeaderboardStore(db_path)
+    store.setup()
+    store.enable_top_cache()
+    server = await LeaderboardServer(store, port).start()
+    print(f"Leaderboard server listening on {HOST}:{server.port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the leaderboard to local game clients")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--db', default=DB_PATH, help="Leaderboard database file")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run_server(args.db, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
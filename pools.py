@@ -0,0 +1,103 @@
+"""Background pools of ready-made items, and shared lazily built singletons.
+
+BackgroundPool keeps a queue of items per key that a daemon thread tops up,
+so take() is normally an O(1) pop. ChallengePool (Time Attack challenges)
+and PrimePairPool (Expert prime pairs) are built on it.
+
+@shared turns a factory function into an accessor for one instance, built
+under a lock on first call: challenge_pool(), prime_pair_pool(), rho_pool()
+and default_engine() are all made this way.
+"""
+import functools
+import sys
+import threading
+from collections import deque
+
+
+class BackgroundPool:
+    """Items made ahead of time for each key in keep(), by a daemon thread
+
+    Subclasses implement make(key). take() pops a ready item, or makes one on
+    the spot when none is ready, and wakes the filler once a queue is down to
+    half of size. Only the keys passed to keep() (or the constructor) are
+    refilled; close() stops the thread.
+    """
+
+    def __init__(self, keys=(), size=2, name=None):
+        self.size = size
+        self._queues = {key: deque() for key in keys}
+        self._wanted = threading.Event()
+        self._closed = False
+        self._wanted.set()
+        self._thread = threading.Thread(target=self._fill, name=name or type(self).__name__,
+                                        daemon=True)
+        self._thread.start()
+
+    def make(self, key):
+        raise NotImplementedError
+
+    def keep(self, *keys):
+        """Keep items ready for exactly these keys; queues for other keys are dropped"""
+        self._queues = {key: self._queues.get(key, deque()) for key in keys}
+        self._wanted.set()
+
+    def take(self, key):
+        queue = self._queues.get(key)
+        if queue is None:
+            return self.make(key)
+        try:
+            item = queue.popleft()
+        except IndexError:
+            item = self.make(key)
+        if len(queue) <= self.size // 2:
+            self._wanted.set()
+        return item
+
+    def ready(self, key):
+        """Items ready for key right now"""
+        queue = self._queues.get(key)
+        return len(queue) if queue is not None else 0
+
+    def close(self, timeout=None):
+        """Stop refilling and wait up to timeout seconds for an item in progress"""
+        self._closed = True
+        self._wanted.set()
+        self._thread.join(timeout)
+
+    def _fill(self):
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            for key, queue in list(self._queues.items()):
+                # Stop early when closed or when keep() drops this key
+                while (len(queue) < self.size and not self._closed
+                       and self._queues.get(key) is queue):
+                    try:
+                        queue.append(self.make(key))
+                    except Exception as ex:
+                        # take() will make the item itself and raise to its caller
+                        print(f"{self._thread.name}: could not make an item for {key!r}: {ex}",
+                              file=sys.stderr)
+                        break
+            if self._closed:
+                return
+
+
+class shared:
+    """Decorator: calling the function returns one instance, built on the first call"""
+
+    def __init__(self, factory):
+        functools.update_wrapper(self, factory)
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self._instance is None:
+                self._instance = self._factory()
+            return self._instance
+
+    def started(self):
+        """The instance if it has been built, else None"""
+        return self._instance
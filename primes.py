@@ -0,0 +1,350 @@
+"""Primality testing and prime generation for the game.
+
+Small numbers (everything the Easy/Medium/Hard difficulties accept) are
+answered from a precomputed bitset sieve. Larger numbers go through
+Miller-Rabin with a fixed witness set, which is deterministic below 2^64.
+Above that is_prime runs Baillie-PSW (Miller-Rabin to base 2 plus a strong
+Lucas test): it has no known counterexample, and unlike a fixed witness set
+it cannot be fooled by composites built against those bases, which matters
+for the big primes Expert players paste in.
+
+Random primes of any size come from sieving a window of odd candidates
+against the small-prime table before running Miller-Rabin on the survivors.
+"""
+import bisect
+import itertools
+import math
+import random
+import time
+
+from pools import BackgroundPool, shared
+
+# Inclusive (min, max) prime range accepted for each difficulty
+DIFFICULTY_RANGES = {
+    "easy": (10, 100),
+    "medium": (100, 1000),
+    "hard": (1000, 10000),
+}
+# Expert plays with real key sizes instead of a prime range
+EXPERT = "expert"
+EXPERT_KEY_BITS = (1024, 2048, 3072, 4096)
+EXPERT_DEFAULT_BITS = 2048
+# Key sizes from which prime work runs in a worker process rather than holding the GIL
+PROCESS_KEY_BITS = 3072
+
+SIEVE_LIMIT = max(hi for _, hi in DIFFICULTY_RANGES.values())
+
+# The first 12 primes are a proven witness set for every n < 2^64
+# (Sorenson & Webster)
+MR_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def _build_sieve(limit):
+    """Return a bitset with bit i set when 2*i + 1 is prime (odd numbers only)"""
+    size = limit // 2 + 1
+    flags = bytearray([1]) * size
+    flags[0] = 0  # 1 is not prime
+    i = 1
+    while (2 * i + 1) ** 2 <= limit:
+        if flags[i]:
+            p = 2 * i + 1
+            start = p * p // 2
+            flags[start::p] = bytes(len(range(start, size, p)))
+        i += 1
+    bits = bytearray((size + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            bits[i >> 3] |= 1 << (i & 7)
+    return bytes(bits)
+
+
+_SIEVE = _build_sieve(SIEVE_LIMIT)
+
+
+def _sieve_lookup(n):
+    if n == 2:
+        return True
+    if n < 2 or not n & 1:
+        return False
+    i = n >> 1
+    return bool(_SIEVE[i >> 3] >> (i & 7) & 1)
+
+
+def _miller_rabin(n, witnesses):
+    d = n - 1
+    s = 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+    for a in witnesses:
+        if a % n == 0:
+            continue
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _jacobi(a, n):
+    """Jacobi symbol (a/n) for odd n > 0"""
+    a %= n
+    result = 1
+    while a:
+        while not a & 1:
+            a >>= 1
+            if n & 7 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a & 3 == 3 and n & 3 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def _strong_lucas(n):
+    """Strong Lucas probable-prime test with Selfridge's parameters (odd n, no small factors)"""
+    if math.isqrt(n) ** 2 == n:
+        return False  # no D with (D/n) = -1 exists for a square
+    D = 5
+    while True:
+        j = _jacobi(D, n)
+        if j == -1:
+            break
+        if j == 0:
+            return False
+        D = -D - 2 if D > 0 else -D + 2
+    Q = (1 - D) // 4
+    d = n + 1
+    s = 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+    # Binary ladder for U_d, V_d and Q^d with P = 1
+    U, V, Qk = 1, 1, Q % n
+    for bit in bin(d)[3:]:
+        U, V, Qk = U * V % n, (V * V - 2 * Qk) % n, Qk * Qk % n
+        if bit == '1':
+            U, V = (U + V) % n, (D * U + V) % n
+            U = (U + n if U & 1 else U) >> 1
+            V = (V + n if V & 1 else V) >> 1
+            Qk = Qk * Q % n
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V = (V * V - 2 * Qk) % n
+        if V == 0:
+            return True
+        Qk = Qk * Qk % n
+    return False
+
+
+def is_prime(n):
+    """Deterministic below 2^64; Baillie-PSW probable prime above"""
+    if n <= SIEVE_LIMIT:
+        return _sieve_lookup(n)
+    for p in MR_WITNESSES:
+        if n % p == 0:
+            return False
+    if n < 1 << 64:
+        return _miller_rabin(n, MR_WITNESSES)
+    return _miller_rabin(n, (2,)) and _strong_lucas(n)
+
+
+def primes_up_to(limit):
+    """List the sieved primes up to min(limit, SIEVE_LIMIT)"""
+    limit = min(limit, SIEVE_LIMIT)
+    return [n for n in range(2, limit + 1) if _sieve_lookup(n)]
+
+
+def prime_in_range(n, difficulty):
+    """True when n is a prime inside the range allowed for difficulty"""
+    lo, hi = DIFFICULTY_RANGES[difficulty]
+    return lo <= n <= hi and is_prime(n)
+
+
+_PRIME_TABLE = primes_up_to(SIEVE_LIMIT)
+_ODD_PRIMES = _PRIME_TABLE[1:]
+
+
+def small_factors(n):
+    """Split n into its distinct prime factors from the sieve table and a cofactor
+
+    Returns (factors, cofactor). When the leftover cofactor is itself prime it
+    is moved into factors, so cofactor is either 1 or a composite with no
+    factor below SIEVE_LIMIT.
+    """
+    factors = []
+    for p in _PRIME_TABLE:
+        if p * p > n:
+            break
+        if n % p == 0:
+            factors.append(p)
+            while n % p == 0:
+                n //= p
+    if n > 1 and is_prime(n):
+        factors.append(n)
+        n = 1
+    return factors, n
+
+# Number of odd candidates sieved at a time when searching for a prime
+SIEVE_WINDOW = 1024
+
+_rng = random.SystemRandom()
+
+
+def _odd_candidates(start, stop):
+    """Yield odd numbers in [start, stop) with no factor in the small-prime table"""
+    start |= 1
+    while start < stop:
+        size = min(SIEVE_WINDOW, (stop - start + 1) // 2)
+        if start <= SIEVE_LIMIT:
+            # The window still holds table primes, which the sieve would strike out
+            yield from range(start, start + 2 * size, 2)
+        else:
+            flags = bytearray([1]) * size
+            for p in _ODD_PRIMES:
+                k = (-start % p) * ((p + 1) // 2) % p  # first index with p | start + 2k
+                if k < size:
+                    flags[k::p] = bytes((size - k - 1) // p + 1)
+            for i in itertools.compress(range(size), flags):
+                yield start + 2 * i
+        start += 2 * size
+
+
+def _first_prime(start, stop):
+    for n in _odd_candidates(start, stop):
+        if is_prime(n):
+            return n
+    return None
+
+
+def random_prime(lo, hi, rng=None):
+    """Return a random prime p with lo <= p <= hi"""
+    rng = rng or _rng
+    if lo > hi:
+        raise ValueError(f"Empty range [{lo}, {hi}]")
+    if hi <= SIEVE_LIMIT:
+        table = _PRIME_TABLE[bisect.bisect_left(_PRIME_TABLE, lo):bisect.bisect_right(_PRIME_TABLE, hi)]
+        if not table:
+            raise ValueError(f"No prime between {lo} and {hi}")
+        return rng.choice(table)
+    start = rng.randint(lo, hi)
+    p = _first_prime(start, hi + 1) or _first_prime(lo, start)
+    if p is None:
+        raise ValueError(f"No prime between {lo} and {hi}")
+    return p
+
+
+def random_prime_bits(bits, rng=None):
+    """Return a random prime of exactly `bits` bits with the top two bits set
+
+    Setting the second-highest bit guarantees that the product of two such
+    primes has exactly 2 * bits bits.
+    """
+    if bits < 2:
+        raise ValueError("A prime needs at least 2 bits")
+    lo = (1 << (bits - 1)) | (1 << (bits - 2))
+    return random_prime(lo, (1 << bits) - 1, rng)
+
+
+def random_prime_pair(lo, hi, rng=None):
+    """Return two distinct random primes in [lo, hi]"""
+    p = random_prime(lo, hi, rng)
+    for _ in range(64):
+        q = random_prime(lo, hi, rng)
+        if q != p:
+            return p, q
+    raise ValueError(f"Not enough primes between {lo} and {hi} for a pair")
+
+
+def prime_pair_for_key(key_bits, rng=None):
+    """Return two distinct primes whose product is a key_bits-bit modulus"""
+    bits = key_bits // 2
+    lo = (1 << (bits - 1)) | (1 << (bits - 2))
+    return random_prime_pair(lo, (1 << bits) - 1, rng)
+
+
+def expert_key_problem(p, q):
+    """Why Expert rejects the primes p and q as a key, or None when it accepts them
+
+    Besides the modulus size, each prime must carry at least a third of the
+    modulus bits: a tiny p makes even a 4096-bit n fall to trial division.
+    """
+    bits = (p * q).bit_length()
+    if p == q:
+        return "p and q must be two different primes."
+    if not EXPERT_KEY_BITS[0] <= bits <= EXPERT_KEY_BITS[-1]:
+        return (f"p * q has {bits} bits; Expert keys need "
+                f"{EXPERT_KEY_BITS[0]} to {EXPERT_KEY_BITS[-1]} bits.")
+    smaller = min(p, q).bit_length()
+    if smaller < bits // 3:
+        return (f"The smaller prime has only {smaller} bits. Each prime needs at least "
+                f"{bits // 3} (a third of n's {bits} bits), or n is easy to factor.")
+    return None
+
+
+def _pair_in_process(key_bits):
+    # Imported here: rsa_parallel imports this module
+    from rsa_parallel import default_engine
+    return default_engine().submit(prime_pair_for_key, key_bits).result()
+
+
+class PrimePairPool(BackgroundPool):
+    """Prime pairs for real key sizes, generated ahead of time on a daemon thread
+
+    A 2048-bit pair takes a few hundred milliseconds to find, so Expert keeps
+    `size` pairs ready for the key size currently picked (see warm()); take()
+    pops one, or generates on the spot when none is ready. Pairs for keys of
+    PROCESS_KEY_BITS and up are generated in a worker process, so the search
+    does not hold the GIL the GUI needs.
+    """
+
+    def __init__(self, size=2, rng=None):
+        self.rng = rng
+        super().__init__(size=size)
+
+    def make(self, key_bits):
+        # A seeded rng must stay in this process for its pairs to be reproducible
+        if key_bits >= PROCESS_KEY_BITS and self.rng is None:
+            return _pair_in_process(key_bits)
+        return prime_pair_for_key(key_bits, self.rng)
+
+    def warm(self, key_bits):
+        """Keep pairs ready for key_bits only, or for no size when it is None"""
+        if key_bits is None:
+            self.keep()
+        else:
+            self.keep(key_bits)
+
+
+@shared
+def prime_pair_pool():
+    """Shared PrimePairPool, started on first use"""
+    return PrimePairPool()
+
+
+def benchmark_prime_generation(bit_sizes=(512, 1024, 2048, 4096), min_time=1.0, rng=None):
+    """Measure random_prime_bits throughput, returning {bits: primes per second}"""
+    results = {}
+    for bits in bit_sizes:
+        count = 0
+        start = time.perf_counter()
+        while True:
+            random_prime_bits(bits, rng)
+            count += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        results[bits] = count / elapsed
+    return results
+
+
+if __name__ == "__main__":
+    for bits, rate in benchmark_prime_generation().items():
+        print(f"{bits:>5}-bit primes: {rate:10.2f} primes/s")
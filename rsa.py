@@ -1,111 +1,420 @@
-import sys
+import os
 import sqlite3
+import sys
 import time
-import random
-import math
-from math import gcd
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+
+# Set RSA_STARTUP_TIMING=1 to print import, QApplication and first-paint times
+STARTUP_TIMING_ENV = 'RSA_STARTUP_TIMING'
+_import_started = time.perf_counter()
+
+if __name__ == "__main__" and sys.argv[1:2] in (["encrypt"], ["decrypt"]):
+    # File encryption needs no GUI, so Qt is never loaded for it
+    from rsa_stream import main
+    sys.exit(main(sys.argv[1:]))
+
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QLabel, QLineEdit, QPushButton, QMessageBox, QStackedWidget, 
-                             QTableWidget, QTextEdit, QTableWidgetItem, QComboBox)
-from PyQt5.QtCore import QTimer, Qt
-from PyQt5.QtGui import QMovie
-from PyQt5.QtWidgets import QLabel
-
-# Setup SQLite database
-def setup_database():
-    conn = sqlite3.connect('game_leaderboard.db')
-    c = conn.cursor()
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS leaderboard (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        player_name TEXT NOT NULL,
-        difficulty TEXT NOT NULL,
-        time INTEGER NOT NULL
-    )''')
-    conn.commit()
-    conn.close()
+                             QTableView, QTextEdit, QComboBox, QFileDialog,
+                             QListView, QPlainTextEdit, QProgressBar)
+from PyQt5.QtCore import (QTimer, Qt, QAbstractListModel, QAbstractTableModel, QModelIndex,
+                          QEvent, QObject, QRect, QSize, pyqtSignal)
+from PyQt5.QtGui import QImage, QMovie, QPainter
+from rsa_engine import DEFAULT_E
+from primes import (DIFFICULTY_RANGES, EXPERT, EXPERT_DEFAULT_BITS, EXPERT_KEY_BITS,
+                    expert_key_problem, prime_pair_pool, random_prime_pair)
+from leaderboard import setup_database, default_store
+from challenges import challenge_pool
+from time_attack import CORRECT, INCORRECT, TimeAttackSession
+from jobs import (JobRunner, primality_job, prime_pair_job, exponent_job, keygen_job,
+                  encrypt_job, decrypt_job, crack_job)
+import tracing
+
+# Seconds the Break the Key stage spends factoring before giving up
+CRACK_BUDGET = 10.0
+
+# Set RSA_STATIC_BACKGROUND=1 to show background.jpg instead of the animation
+STATIC_BACKGROUND_ENV = 'RSA_STATIC_BACKGROUND'
+BACKGROUND_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKGROUND_JPG = os.path.join(BACKGROUND_DIR, 'background.jpg')
+BACKGROUND_GIF = os.path.join(BACKGROUND_DIR, 'background.gif')
+# Animation frames are decoded at the still image's size (the GIF is 1920x1080)
+BACKGROUND_SIZE = QSize(640, 360)
+
+HACKER_STYLESHEET = """
+    QWidget {
+        background-color: black;
+        color: #33ff33;
+        font-family: 'Courier New';
+    }
+    QStackedWidget, QLabel {
+        background-color: transparent;
+    }
+    QPushButton {
+        background-color: black;
+        color: #33ff33;
+        border: 2px solid #33ff33;
+        font-size: 16px;
+        padding: 5px;
+    }
+    QPushButton:hover {
+        background-color: #33ff33;
+        color: white;
+    }
+    QLineEdit, QPlainTextEdit {
+        background-color: black;
+        color: #33ff33;
+        border: 1px solid #33ff33;
+        font-size: 16px;
+    }
+    QLabel {
+        font-size: 18px;
+    }
+    QTableView, QListView {
+        border: 1px solid #33ff33;
+        gridline-color: #33ff33;
+    }
+    QTableView::item {
+        padding: 5px;
+    }
+    QTableView::item:selected {
+        background-color: #33ff33;
+        color: #000000;
+    }    
+    QHeaderView::section {
+        background-color: transparent;
+        color: #33ff33;
+        padding: 4px;
+        border: 1px solid #33ff33;
+    }     
+"""
+
+def close_pools():
+    """Stop the background pools that were started; connected to aboutToQuit"""
+    for pool in (challenge_pool, prime_pair_pool):
+        if pool.started():
+            pool().close(timeout=1)
 
 # Function to apply hacker theme
-def apply_hacker_theme(widget):
-    widget.setStyleSheet("""
-        QWidget {
-            background-color: black;
-            color: #33ff33;
-            font-family: 'Courier New';
-            background-image: url('background.jpg');
-            background-repeat: no-repeat;
-            background-position: center;
-        }
-        QPushButton {
-            background-color: black;
-            color: #33ff33;
-            border: 2px solid #33ff33;
-            font-size: 16px;
-            padding: 5px;
-        }
-        QPushButton:hover {
-            background-color: #33ff33;
-            color: white;
-        }
-        QLineEdit {
-            background-color: black;
-            color: #33ff33;
-            border: 1px solid #33ff33;
-            font-size: 16px;
-        }
-        QLabel {
-            font-size: 18px;
-        }
-        QTableWidget {
-            border: 1px solid #33ff33;
-            gridline-color: #33ff33;
-        }
-        QTableWidget::item {
-            padding: 5px;
-        }
-        QTableWidget::item:selected {
-            background-color: #33ff33;
-            color: #000000;
-        }    
-        QHeaderView::section {
-            background-color: transparent;
-            color: #33ff33;
-            padding: 4px;
-            border: 1px solid #33ff33;
-        }     
-    """)
-
-    # Create a QLabel to hold the animated GIF
-    # label = QLabel(widget)
-    # movie = QMovie("background.gif")
-    # label.setMovie(movie)
-    # movie.start()
-
-    # # Resize the label to cover the entire widget
-    # label.setGeometry(0, 0, widget.width(), widget.height())
-    # label.lower()  # Ensure the label is behind other widgets
-
-def add_score(player_name, difficulty, time_taken):
-    conn = sqlite3.connect('game_leaderboard.db')
-    c = conn.cursor()
-    c.execute('''
-    INSERT INTO leaderboard (player_name, difficulty, time)
-    VALUES (?, ?, ?)
-    ''', (player_name, difficulty, time_taken))
-    conn.commit()
-    conn.close()
-
-def get_top_scores():
-    conn = sqlite3.connect('game_leaderboard.db')
-    c = conn.cursor()
-    c.execute('''
-    SELECT player_name, difficulty, time FROM leaderboard
-    ORDER BY time ASC
-    LIMIT 5
-    ''')
-    top_scores = c.fetchall()
-    conn.close()
-    return top_scores
+def apply_hacker_theme(app):
+    """Style the whole application; call once, on the QApplication"""
+    app.setStyleSheet(HACKER_STYLESHEET)
+
+class SharedBackground(QObject):
+    """The one decoded background every ThemedScreen paints from
+
+    background.gif is decoded by a single QMovie during its first loop and
+    each frame is kept (scaled, 16-bit), after which playback just cycles the
+    cached frames on a timer. Nothing runs while no screen is visible.
+    """
+    changed = pyqtSignal()
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        super().__init__()
+        self.frames = []  # (image, delay in ms)
+        self.index = 0
+        self.users = 0
+        self.movie = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._next_frame)
+        if not os.environ.get(STATIC_BACKGROUND_ENV):
+            movie = QMovie(BACKGROUND_GIF)
+            if movie.isValid() and movie.frameCount() > 1:
+                movie.setCacheMode(QMovie.CacheNone)
+                movie.setScaledSize(BACKGROUND_SIZE)
+                movie.frameChanged.connect(self._decoded)
+                self.movie = movie
+        self.image = QImage() if self.movie is not None else QImage(BACKGROUND_JPG)
+
+    def attach(self):
+        """A screen became visible; run the animation"""
+        self.users += 1
+        if self.users > 1:
+            return
+        if self.movie is not None:
+            if self.movie.state() == QMovie.Paused:
+                self.movie.setPaused(False)
+            else:
+                self.movie.start()
+        elif self.frames:
+            self.timer.start(self.frames[self.index][1])
+
+    def detach(self):
+        """A screen was hidden; pause once none are left"""
+        self.users -= 1
+        if self.users:
+            return
+        if self.movie is not None:
+            self.movie.setPaused(True)
+        self.timer.stop()
+
+    def _decoded(self, number):
+        if len(self.frames) == self.movie.frameCount():
+            # One full loop is cached; the decoder is no longer needed
+            self.movie.stop()
+            self.movie.deleteLater()
+            self.movie = None
+            self.index = len(self.frames) - 1
+            self._next_frame()
+            return
+        image = self.movie.currentImage().convertToFormat(QImage.Format_RGB16)
+        self.frames.append((image, max(20, self.movie.nextFrameDelay())))
+        self.image = image
+        self.changed.emit()
+
+    def _next_frame(self):
+        self.index = (self.index + 1) % len(self.frames)
+        self.image, delay = self.frames[self.index]
+        self.changed.emit()
+        if self.users:
+            self.timer.start(delay)
+
+class ThemedScreen(QWidget):
+    """A game screen drawn over the shared, centred background"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.background = SharedBackground.instance()
+        self._attached = False
+
+    def background_rect(self):
+        size = self.background.image.size()
+        return QRect((self.width() - size.width()) // 2, (self.height() - size.height()) // 2,
+                     size.width(), size.height())
+
+    def _repaint_background(self):
+        self.update(self.background_rect())
+
+    def showEvent(self, event):
+        if not self._attached:
+            self._attached = True
+            self.background.changed.connect(self._repaint_background)
+            self.background.attach()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        if self._attached:
+            self._attached = False
+            self.background.changed.disconnect(self._repaint_background)
+            self.background.detach()
+        super().hideEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), Qt.black)
+        if not self.background.image.isNull():
+            painter.drawImage(self.background_rect().topLeft(), self.background.image)
+
+def parse_int(text):
+    """Read a typed or pasted integer; whitespace and line breaks are ignored, 0x means hex"""
+    text = "".join(text.split())
+    if text[:2].lower() == "0x":
+        return int(text[2:], 16)
+    return int(text)
+
+def format_big(value, edge=12):
+    """Abbreviate long numbers for labels: first and last digits plus the digit count"""
+    digits = str(value)
+    if len(digits) <= 2 * edge + 8:
+        return digits
+    return f"{digits[:edge]}…{digits[-edge:]} ({len(digits)} digits)"
+
+class CiphertextModel(QAbstractListModel):
+    """Pages a CipherBuffer into a list view, formatting only the rows Qt asks for"""
+    VALUES_PER_ROW = 16
+    # Values per row shrink for large moduli so a row stays about this long
+    ROW_CHARS = 128
+    PAGE_ROWS = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.buffer = []
+        self.values_per_row = self.VALUES_PER_ROW
+        self.total_rows = 0
+        self.loaded_rows = 0
+
+    def set_buffer(self, buffer):
+        self.beginResetModel()
+        self.buffer = buffer
+        digits = len(str(buffer.n)) if hasattr(buffer, 'n') else 1
+        self.values_per_row = max(1, min(self.VALUES_PER_ROW, self.ROW_CHARS // digits))
+        self.total_rows = -(-len(buffer) // self.values_per_row)
+        self.loaded_rows = min(self.PAGE_ROWS, self.total_rows)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded_rows
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.loaded_rows < self.total_rows
+
+    def fetchMore(self, parent):
+        count = min(self.PAGE_ROWS, self.total_rows - self.loaded_rows)
+        self.beginInsertRows(QModelIndex(), self.loaded_rows, self.loaded_rows + count - 1)
+        self.loaded_rows += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        start = index.row() * self.values_per_row
+        return " ".join(map(str, self.buffer[start:start + self.values_per_row]))
+
+class LeaderboardModel(QAbstractTableModel):
+    """Leaderboard rows fetched one keyset page at a time as the view scrolls
+
+    A page that cannot be fetched (server down or timing out, database
+    error) stops further fetching and is reported through `failed`;
+    set_difficulty() or refresh() tries again.
+    """
+    HEADERS = ["Player", "Difficulty", "Time (s)"]
+    PAGE_SIZE = 200
+    failed = pyqtSignal(str)
+
+    def __init__(self, store=None, parent=None):
+        super().__init__(parent)
+        self.store = store or default_store()
+        self.difficulty = None
+        self.rows = []
+        self.exhausted = False
+
+    def set_difficulty(self, difficulty):
+        """Show one difficulty (or all, for None) starting from the fastest time"""
+        self.beginResetModel()
+        self.difficulty = difficulty
+        self.rows = []
+        self.exhausted = False
+        self.endResetModel()
+
+    def refresh(self):
+        self.set_difficulty(self.difficulty)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent):
+        after = (self.rows[-1][3], self.rows[-1][0]) if self.rows else None
+        try:
+            page = self.store.page(self.difficulty, after, self.PAGE_SIZE)
+        except (OSError, RuntimeError, sqlite3.Error) as ex:
+            # Raising out of a Qt virtual method would abort the application
+            self.exhausted = True
+            self.failed.emit(f"Could not load the leaderboard: {ex}")
+            return
+        if len(page) < self.PAGE_SIZE:
+            self.exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        # Row tuples are (id, player_name, difficulty, time)
+        return str(self.rows[index.row()][index.column() + 1])
+
+class LeaderboardView(QWidget):
+    """Difficulty filter plus a lazily filled leaderboard table"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.filter_combo = QComboBox()
+        self.filter_combo.addItems(["All", "Easy", "Medium", "Hard"])
+        self.filter_combo.currentTextChanged.connect(self.apply_filter)
+
+        self.model = LeaderboardModel(parent=self)
+        self.model.failed.connect(self.show_error)
+        self.model.modelReset.connect(self.clear_error)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+
+        self.error_label = QLabel()
+        self.error_label.setWordWrap(True)
+        self.error_label.hide()
+
+        layout.addWidget(self.filter_combo)
+        layout.addWidget(self.error_label)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+    def show_error(self, message):
+        self.error_label.setText(message)
+        self.error_label.show()
+
+    def clear_error(self):
+        self.error_label.hide()
+
+    def apply_filter(self, text):
+        self.model.set_difficulty(None if text == "All" else text.lower())
+
+    def refresh(self):
+        self.model.refresh()
+
+class StartupTimer(QObject):
+    """Times the steps to a window's first paint and prints them to stderr"""
+    def __init__(self, label, started=None):
+        super().__init__()
+        self.label = label
+        self.started = time.perf_counter() if started is None else started
+        self.marks = []
+
+    @classmethod
+    def enabled(cls):
+        return bool(os.environ.get(STARTUP_TIMING_ENV))
+
+    def mark(self, step):
+        self.marks.append((step, time.perf_counter()))
+
+    def watch(self, window):
+        """Report once the window's central widget is first painted"""
+        window.centralWidget().installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            self.mark("first paint")
+            self.report()
+        return False
+
+    def report(self):
+        steps = []
+        last = self.started
+        for step, at in self.marks:
+            steps.append(f"{step} {(at - last) * 1000:.1f} ms")
+            last = at
+        total = (last - self.started) * 1000
+        print(f"{self.label} startup: {', '.join(steps)}; total {total:.1f} ms", file=sys.stderr)
+
+def open_window(window_class, label):
+    """Create and show a window, timing it when startup timing is enabled"""
+    timer = StartupTimer(label) if StartupTimer.enabled() else None
+    window = window_class()
+    window.show()
+    if timer is not None:
+        timer.mark("construct")
+        timer.watch(window)
+        window.startup_timer = timer
+    return window
 
 class MainMenu(QMainWindow):
     def __init__(self):
@@ -129,23 +438,19 @@ class MainMenu(QMainWindow):
         layout.addWidget(self.time_attack_btn)
         layout.addWidget(self.rsa_game_btn)
         
-        widget = QWidget()
+        widget = ThemedScreen()
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         self.setCentralWidget(widget)
     
     def open_time_attack(self):
-        self.time_attack_window = TimeAttackGame()
-        self.time_attack_window.show()
-    
+        self.time_attack_window = open_window(TimeAttackGame, "Time Attack")
+
     def open_rsa_game(self):
         if not hasattr(self, 'rsa_game_window') or not self.rsa_game_window.isVisible():
-            self.rsa_game_window = RSAGame()
-            self.rsa_game_window.show()
-    
+            self.rsa_game_window = open_window(RSAGame, "RSA Game")
+
     def open_leaderboard(self):
-        self.leaderboard_window = Leaderboard()
-        self.leaderboard_window.show()
+        self.leaderboard_window = open_window(Leaderboard, "Leaderboard")
 
 # RSA Game Class (from test.py)
 class RSAGame(QMainWindow):
@@ -158,31 +463,51 @@ class RSAGame(QMainWindow):
         self.difficulty = "easy"
         self.stage = 0
         self.p = self.q = self.n = self.phi = self.e = self.d = None
+        self.key = None
+        self.cracked = None
         self.plaintext = ""
         self.ciphertext = []
+        self.block_mode = False
         self.time_elapsed = 0
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_timer)
+
+        # Heavy steps run on a thread pool; the status bar shows their progress
+        self.jobs = JobRunner(self)
+        self.job = None
+        self.job_progress = QProgressBar()
+        self.job_progress.setMaximumWidth(200)
+        self.cancel_job_btn = QPushButton("Cancel")
+        self.cancel_job_btn.clicked.connect(self.cancel_job)
+        self.statusBar().addPermanentWidget(self.job_progress)
+        self.statusBar().addPermanentWidget(self.cancel_job_btn)
+        self.job_progress.hide()
+        self.cancel_job_btn.hide()
         
         # Create main stack
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
-        
-        # Create screens
-        self.main_menu = self.create_main_menu()
-        self.stage1_widget = self.create_stage1()
-        self.stage2_widget = self.create_stage2()
-        self.stage3_widget = self.create_stage3()
-        self.stage4_widget = self.create_stage4()
-        
-        self.stack.addWidget(self.main_menu)
-        self.stack.addWidget(self.stage1_widget)
-        self.stack.addWidget(self.stage2_widget)
-        self.stack.addWidget(self.stage3_widget)
-        self.stack.addWidget(self.stage4_widget)
-        
+
+        # Screens are built on first navigation, in stage order (later
+        # stages reuse widgets created by earlier ones)
+        self.stage_factories = [self.create_main_menu, self.create_stage1, self.create_stage2,
+                                self.create_stage3, self.create_stage4, self.create_stage5]
+        self.stage_widgets = []
+        self.show_stage(0)
+
+    def stage_widget(self, index):
+        """Return the screen for stage index, building it and earlier stages if needed"""
+        while len(self.stage_widgets) <= index:
+            widget = self.stage_factories[len(self.stage_widgets)]()
+            self.stage_widgets.append(widget)
+            self.stack.addWidget(widget)
+        return self.stage_widgets[index]
+
+    def show_stage(self, index):
+        self.stack.setCurrentWidget(self.stage_widget(index))
+
     def create_main_menu(self):
-        widget = QWidget()
+        widget = ThemedScreen()
         layout = QVBoxLayout()
         
         title = QLabel("RSA Crypto Game")
@@ -190,7 +515,7 @@ class RSAGame(QMainWindow):
         title.setStyleSheet("font-size: 24px; font-weight: bold; margin: 20px;")
         
         self.difficulty_combo = QComboBox()
-        self.difficulty_combo.addItems(["Easy", "Medium", "Hard"])
+        self.difficulty_combo.addItems(["Easy", "Medium", "Hard", "Expert"])
         
         start_btn = QPushButton("Start Game")
         start_btn.clicked.connect(self.start_game)
@@ -202,11 +527,10 @@ class RSAGame(QMainWindow):
         layout.addStretch()
         
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         return widget
     
     def create_stage1(self):
-        widget = QWidget()
+        widget = ThemedScreen()
         layout = QVBoxLayout()
         
         self.stage1_title = QLabel("Stage 1: Prime Number Selection")
@@ -221,54 +545,94 @@ class RSAGame(QMainWindow):
         validate_btn = QPushButton("Validate Primes")
         validate_btn.clicked.connect(self.validate_primes)
         
+        self.suggest_btn = QPushButton("Suggest Primes")
+        self.suggest_btn.clicked.connect(self.suggest_primes)
+        
+        # Expert only: the modulus size to generate primes for
+        self.key_bits_label = QLabel("Key size (bits):")
+        self.key_bits_combo = QComboBox()
+        self.key_bits_combo.addItems(map(str, EXPERT_KEY_BITS))
+        self.key_bits_combo.setCurrentText(str(EXPERT_DEFAULT_BITS))
+        self.key_bits_combo.currentTextChanged.connect(
+            lambda bits: prime_pair_pool().warm(int(bits)))
+        
         layout.addWidget(self.stage1_title)
         layout.addWidget(QLabel("Enter two prime numbers:"))
         layout.addWidget(self.p_input)
         layout.addWidget(self.q_input)
+        layout.addWidget(self.key_bits_label)
+        layout.addWidget(self.key_bits_combo)
         layout.addWidget(validate_btn)
+        layout.addWidget(self.suggest_btn)
         layout.addStretch()
         
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         return widget
+
+    def configure_stage1(self):
+        """Show the key size picker and start generating primes for Expert"""
+        expert = self.difficulty == EXPERT
+        self.key_bits_label.setVisible(expert)
+        self.key_bits_combo.setVisible(expert)
+        self.suggest_btn.setText("Generate Primes" if expert else "Suggest Primes")
+        if expert:
+            self.p_input.setPlaceholderText("Paste or generate the first prime (p)")
+            self.q_input.setPlaceholderText("Paste or generate the second prime (q)")
+            prime_pair_pool().warm(int(self.key_bits_combo.currentText()))
+        elif prime_pair_pool.started():
+            prime_pair_pool().warm(None)
     
     def validate_primes(self):
         p = self.p_input.text()
         q = self.q_input.text()
         
         try:
-            p = int(p)
-            q = int(q)
+            p = parse_int(p)
+            q = parse_int(q)
         except ValueError:
             QMessageBox.warning(self, "Invalid Input", "Please enter valid integers")
             return
         
         difficulty = self.difficulty  # This is the current difficulty
-        if difficulty == "easy":
-            min_prime, max_prime = 10, 100
-        elif difficulty == "medium":
-            min_prime, max_prime = 100, 1000
-        elif difficulty == "hard":
-            min_prime, max_prime = 1000, 10000
-        else:
+        if difficulty == EXPERT:
+            problem = expert_key_problem(p, q)
+            if problem:
+                QMessageBox.warning(self, "Weak Key", problem)
+                return
+        elif difficulty not in DIFFICULTY_RANGES:
             QMessageBox.warning(self, "Unknown Difficulty", "Invalid difficulty level")
             return
-        
-        if not (self.is_prime(p) and self.is_prime(q)):
-            QMessageBox.warning(self, "Invalid Primes", "Both numbers must be prime!")
-            return
+        else:
+            min_prime, max_prime = DIFFICULTY_RANGES[difficulty]
+            if p < min_prime or q < min_prime or p > max_prime or q > max_prime:  # Check if within range
+                QMessageBox.warning(self, "Prime Out of Range", f"Choose prime numbers between {min_prime} and {max_prime}!")
+                return
 
-        if p < min_prime or q < min_prime or p > max_prime or q > max_prime:  # Check if within range
-            QMessageBox.warning(self, "Prime Out of Range", f"Choose prime numbers between {min_prime} and {max_prime}!")
-            return
+        self.run_job("Checking primes", primality_job, p, q,
+                     on_result=lambda valid: self.primes_checked(p, q, valid))
 
+    def primes_checked(self, p, q, valid):
+        if not valid:
+            QMessageBox.warning(self, "Invalid Primes", "Both numbers must be prime!")
+            return
         self.p = p
         self.q = q
         self.show_stage2()
 
     
+    def suggest_primes(self):
+        if self.difficulty == EXPERT:
+            self.run_job("Generating primes", prime_pair_job, int(self.key_bits_combo.currentText()),
+                         on_result=lambda pair: self.primes_suggested(*pair))
+        else:
+            self.primes_suggested(*random_prime_pair(*DIFFICULTY_RANGES[self.difficulty]))
+
+    def primes_suggested(self, p, q):
+        self.p_input.setText(str(p))
+        self.q_input.setText(str(q))
+
     def create_stage2(self):
-        widget = QWidget()
+        widget = ThemedScreen()
         layout = QVBoxLayout()
         
         self.stage2_title = QLabel("Stage 2: Key Generation")
@@ -292,7 +656,6 @@ class RSAGame(QMainWindow):
         layout.addStretch()
         
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         return widget
     
     def generate_keys(self):
@@ -309,72 +672,82 @@ class RSAGame(QMainWindow):
             return
         
         self.e = int(selected_e)
-        try:
-            self.d = self.mod_inverse(self.e, self.phi)
-            if self.d is None:
-                raise ValueError("No modular inverse found.")
-        except Exception as ex:
-            QMessageBox.warning(self, "Key Generation Error", f"Failed to generate keys: {ex}")
-            return
-        
-        #QMessageBox.information(self, "Key Generated", f"Your Private Key (d) is: {self.d}")
-        QMessageBox.information(self, "Key Generated", f"Your Private Key (d) is: {self.d}\nPublic Key (e) is: {self.e}\nPhi(n) is: {self.phi}\nModulus (n) is: {self.n}")
+        self.run_job("Generating keys", keygen_job, self.p, self.q, self.e,
+                     on_result=self.keys_generated,
+                     on_error=lambda ex: QMessageBox.warning(self, "Key Generation Error",
+                                                             f"Failed to generate keys: {ex}"))
+
+    def keys_generated(self, key):
+        self.key = key
+        self.d = key.d
+        summary = (f"Your Private Key (d) is: {format_big(self.d)}\nPublic Key (e) is: {self.e}\n"
+                   f"Phi(n) is: {format_big(self.phi)}\nModulus (n) is: {format_big(self.n)}")
+        box = QMessageBox(QMessageBox.Information, "Key Generated", summary, QMessageBox.Ok, self)
+        if format_big(self.n) != str(self.n):
+            # Full values, selectable for copying d into Stage 4
+            box.setDetailedText(f"d = {self.d}\n\ne = {self.e}\n\nn = {self.n}\n\nphi(n) = {self.phi}")
+        box.exec_()
         self.show_stage3()
 
 
     def create_stage3(self):
-        widget = QWidget()
+        widget = ThemedScreen()
         layout = QVBoxLayout()
         
         self.stage3_title = QLabel("Stage 3: Encryption")
         self.stage3_title.setStyleSheet("font-size: 18px; font-weight: bold;")
         
-        self.plaintext_input = QLineEdit()
+        self.plaintext_input = QPlainTextEdit()
         self.plaintext_input.setPlaceholderText("Enter message to encrypt")
         
+        self.encrypt_mode_combo = QComboBox()
+        self.encrypt_mode_combo.addItems(["Per character", "Block packed"])
+        
         encrypt_btn = QPushButton("Encrypt")
         encrypt_btn.clicked.connect(self.encrypt_message)
         
-        self.ciphertext_display = QTextEdit()
-        self.ciphertext_display.setReadOnly(True)
+        # Only the visible rows of the ciphertext are ever formatted
+        self.ciphertext_model = CiphertextModel(self)
+        self.ciphertext_display = QListView()
+        self.ciphertext_display.setUniformItemSizes(True)
+        self.ciphertext_display.setModel(self.ciphertext_model)
         
         layout.addWidget(self.stage3_title)
         layout.addWidget(QLabel("Enter plaintext message:"))
         layout.addWidget(self.plaintext_input)
+        layout.addWidget(QLabel("Encoding mode:"))
+        layout.addWidget(self.encrypt_mode_combo)
         layout.addWidget(encrypt_btn)
         layout.addStretch()
         
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         return widget
     
     def encrypt_message(self):
-        if self.e is None or self.n is None:
+        if self.key is None:
             QMessageBox.warning(self, "Encryption Error", "Public key (e, n) is not set properly!")
             return
 
-        self.plaintext = self.plaintext_input.text()
+        self.plaintext = self.plaintext_input.toPlainText()
         if not self.plaintext:
             QMessageBox.warning(self, "Empty Message", "Please enter a message to encrypt")
             return
 
-        print(f"Debug: e={self.e}, n={self.n}")  # Debugging line
-
-        # Convert to ASCII values and encrypt
-        try:
-            self.ciphertext = [pow(ord(c), self.e, self.n) for c in self.plaintext]
-        except TypeError as ex:
-            print(f"Encryption Error: {ex}")
-            QMessageBox.warning(self, "Encryption Failed", "An error occurred during encryption.")
-            return
+        # Convert to ASCII values (or packed blocks) and encrypt
+        self.block_mode = self.encrypt_mode_combo.currentText() == "Block packed"
+        self.run_job("Encrypting", encrypt_job, self.key, self.plaintext, self.block_mode,
+                     on_result=self.message_encrypted,
+                     on_error=lambda ex: QMessageBox.warning(self, "Encryption Failed",
+                                                             "An error occurred during encryption."))
 
+    def message_encrypted(self, ciphertext):
         # Display results
-        result = f"Encrypted: {self.ciphertext}"
-        self.ciphertext_display.setPlainText(result)
+        self.ciphertext = ciphertext
+        self.ciphertext_model.set_buffer(self.ciphertext)
         self.show_stage4()
 
     def create_stage4(self):
-        widget = QWidget()
+        widget = ThemedScreen()
         layout = QVBoxLayout()
         
         self.stage4_title = QLabel("Stage 4: Decryption")
@@ -386,6 +759,12 @@ class RSAGame(QMainWindow):
         decrypt_btn = QPushButton("Decrypt")
         decrypt_btn.clicked.connect(self.decrypt_message)
         
+        save_btn = QPushButton("Save Ciphertext")
+        save_btn.clicked.connect(self.save_ciphertext)
+        
+        break_btn = QPushButton("Break the Key")
+        break_btn.clicked.connect(self.show_stage5)
+        
         self.decrypted_display = QTextEdit()
         self.decrypted_display.setReadOnly(True)
         
@@ -395,35 +774,117 @@ class RSAGame(QMainWindow):
         layout.addWidget(decrypt_btn)
         layout.addWidget(QLabel("Ciphertext:"))
         layout.addWidget(self.ciphertext_display)
+        layout.addWidget(save_btn)
         layout.addWidget(QLabel("Decrypted Message:"))
         layout.addWidget(self.decrypted_display)
+        layout.addWidget(break_btn)
         layout.addStretch()
         
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         return widget
-    
-    def decrypt_message(self):
+
+    def create_stage5(self):
+        widget = ThemedScreen()
+        layout = QVBoxLayout()
+        
+        self.stage5_title = QLabel("Stage 5: Break the Key")
+        self.stage5_title.setStyleSheet("font-size: 18px; font-weight: bold;")
+        
+        self.crack_n_input = QLineEdit()
+        self.crack_n_input.setPlaceholderText("Modulus (n)")
+        self.crack_e_input = QLineEdit()
+        self.crack_e_input.setPlaceholderText("Public exponent (e)")
+        
+        crack_btn = QPushButton("Factor n")
+        crack_btn.clicked.connect(self.crack_key)
+        
+        self.crack_display = QTextEdit()
+        self.crack_display.setReadOnly(True)
+        
+        self.use_cracked_btn = QPushButton("Decrypt with Recovered Key")
+        self.use_cracked_btn.clicked.connect(self.use_cracked_key)
+        self.use_cracked_btn.setEnabled(False)
+        
+        back_btn = QPushButton("Back to Decryption")
+        back_btn.clicked.connect(self.show_stage4)
+        
+        layout.addWidget(self.stage5_title)
+        layout.addWidget(QLabel("Only n and e are public. Factor n to recover the private key d:"))
+        layout.addWidget(self.crack_n_input)
+        layout.addWidget(self.crack_e_input)
+        layout.addWidget(crack_btn)
+        layout.addWidget(self.crack_display)
+        layout.addWidget(self.use_cracked_btn)
+        layout.addWidget(back_btn)
+        layout.addStretch()
+        
+        widget.setLayout(layout)
+        return widget
+
+    def crack_key(self):
         try:
-            d = int(self.d_input.text())
-            print(f"Debug: Entered Private Key (d) = {d}")  # Debugging
+            n = parse_int(self.crack_n_input.text())
+            e = parse_int(self.crack_e_input.text())
         except ValueError:
-            QMessageBox.warning(self, "Invalid Input", "Please enter a valid integer for d")
+            QMessageBox.warning(self, "Invalid Input", "Please enter valid integers for n and e")
             return
+        if n < 4 or e < 2:
+            QMessageBox.warning(self, "Invalid Input", "n must be at least 4 and e at least 2")
+            return
+
+        self.cracked = None
+        self.use_cracked_btn.setEnabled(False)
+        self.crack_display.setPlainText(f"Factoring a {n.bit_length()}-bit n...")
+        self.run_job("Factoring n", crack_job, n, e, CRACK_BUDGET,
+                     on_result=self.key_cracked, on_error=self.crack_failed)
+
+    def key_cracked(self, cracked):
+        self.cracked = cracked
+        factors = " × ".join(map(str, cracked.factors))
+        self.crack_display.setPlainText(
+            f"n = {factors}\nφ(n) = {cracked.phi}\nd = e⁻¹ mod φ(n) = {cracked.d}\n\n"
+            f"Found by {', '.join(cracked.tiers)} in {cracked.seconds * 1000:.1f} ms")
+        self.use_cracked_btn.setEnabled(self.key is not None and cracked.n == self.n)
+
+    def crack_failed(self, ex):
+        from factoring import FactoringTimeout
+        if isinstance(ex, FactoringTimeout):
+            self.crack_display.setPlainText(f"{ex}.\nThis is what keeps real RSA keys safe: "
+                                            f"their primes are far too large to find.")
+        else:
+            self.crack_display.setPlainText(f"Could not break the key: {ex}")
 
-        print(f"Debug: Decrypting with d={d}, n={self.n}")  # Debugging
+    def use_cracked_key(self):
+        self.d_input.setText(str(self.cracked.d))
+        self.show_stage4()
+    
+    def save_ciphertext(self):
+        if not self.ciphertext:
+            QMessageBox.warning(self, "Nothing to Save", "Encrypt a message first")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save Ciphertext", "message.rsac")
+        if not path:
+            return
+        from rsa_stream import MODE_BLOCK, MODE_CHAR, save_ciphertext
+        mode = MODE_BLOCK if self.block_mode else MODE_CHAR
+        try:
+            save_ciphertext(path, self.ciphertext, self.n, self.e, mode, len(self.plaintext.encode('utf-8')))
+        except OSError as ex:
+            QMessageBox.warning(self, "Save Failed", f"Could not write {path}: {ex}")
 
+    def decrypt_message(self):
         try:
-            decrypted = [chr(pow(c, d, self.n)) for c in self.ciphertext]
-            decrypted_text = ''.join(decrypted)
-        except Exception as ex:
-            print(f"Decryption Error: {ex}")
-            QMessageBox.warning(self, "Decryption Failed", "An error occurred during decryption.")
+            d = parse_int(self.d_input.text())
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Input", "Please enter a valid integer for d")
             return
 
-        print(f"Debug: Decrypted ASCII: {[ord(c) for c in decrypted_text]}")
-        print(f"Debug: Decrypted Message: {decrypted_text}")
+        self.run_job("Decrypting", decrypt_job, self.key, self.ciphertext, d, self.block_mode,
+                     on_result=self.message_decrypted,
+                     on_error=lambda ex: QMessageBox.warning(self, "Decryption Failed",
+                                                             "An error occurred during decryption."))
 
+    def message_decrypted(self, decrypted_text):
         self.decrypted_display.setPlainText(f"Decrypted Message: {decrypted_text}")
 
         if decrypted_text == self.plaintext:
@@ -439,84 +900,106 @@ class RSAGame(QMainWindow):
 
 
     
-    # Helper functions
-    def is_prime(self, n, k=5):
-        if n <= 1:
-            return False
-        for p in [2,3,5,7,11,13,17,19,23,29]:
-            if n % p == 0:
-                return n == p
-        d = n-1
-        s = 0
-        while d % 2 == 0:
-            d //= 2
-            s += 1
-        for _ in range(k):
-            a = random.randint(2, min(n-2, 1<<20))
-            x = pow(a, d, n)
-            if x == 1 or x == n-1:
-                continue
-            for __ in range(s-1):
-                x = pow(x, 2, n)
-                if x == n-1:
-                    break
-            else:
-                return False
-        return True
-    
-    def mod_inverse(self, e, phi):
-        try:
-            return pow(e, -1, phi)
-        except ValueError:
-            print(f"Error: No modular inverse for e={e}, phi={phi}")
-            return None
-
-    
     # Navigation functions
     def start_game(self):
         self.difficulty = self.difficulty_combo.currentText().lower()
         self.time_elapsed = 0  # Reset timer
         self.timer.start(1000)  # Start timer with 1-second intervals
-        self.stack.setCurrentIndex(1)
+        self.stage_widget(1)
+        self.configure_stage1()
+        self.show_stage(1)
 
     
     def show_stage2(self):
-        if self.stage2_widget is None:
-            QMessageBox.warning(self, "Error", "Stage 2 UI was not initialized.")
-            return
-        self.stack.setCurrentWidget(self.stage2_widget)
+        self.stage_widget(2)
     
         self.n = self.p * self.q
         self.phi = (self.p - 1) * (self.q - 1)
 
-        self.n_label.setText(f"n = p * q = {self.n}")
-        self.phi_label.setText(f"φ(n) = (p-1)(q-1) = {self.phi}")
+        self.n_label.setText(f"n = p * q = {format_big(self.n)}")
+        self.phi_label.setText(f"φ(n) = (p-1)(q-1) = {format_big(self.phi)}")
 
-        # Generate valid e values
+        # Generate valid e values; Expert starts at the standard 65537
+        start = DEFAULT_E if self.difficulty == EXPERT else 3
         self.e_combo.clear()
-        valid_es = [e for e in range(3, self.phi) if gcd(e, self.phi) == 1 and e < self.phi][:10]
-        self.e_combo.addItems(map(str, valid_es))
+        self.e_combo.addItem("Finding public exponents...")
+        self.run_job("Finding exponents", exponent_job, self.p, self.q, 10, start,
+                     on_result=self.exponents_found)
 
-        print(f"Debug: Valid e values = {valid_es}")  # Debugging
+        self.show_stage(2)
 
-        self.stack.setCurrentIndex(2)
+    def exponents_found(self, valid_es):
+        self.e_combo.clear()
+        self.e_combo.addItems(map(str, valid_es))
 
     
     def show_stage3(self):
-        self.stack.setCurrentIndex(3)
+        self.stage_widget(3)
+        # Real-size keys only make sense block packed
+        expert = self.difficulty == EXPERT
+        if expert:
+            self.encrypt_mode_combo.setCurrentText("Block packed")
+        self.encrypt_mode_combo.setEnabled(not expert)
+        self.show_stage(3)
     
     def show_stage4(self):
-        self.stack.setCurrentIndex(4)
+        self.show_stage(4)
+
+    def show_stage5(self):
+        self.stage_widget(5)
+        if self.key is not None:
+            self.crack_n_input.setText(str(self.n))
+            self.crack_e_input.setText(str(self.e))
+        self.show_stage(5)
     
+    def run_job(self, label, func, *args, on_result, on_error=None):
+        """Run func on the job pool, replacing (cancelling) any job still running"""
+        self.cancel_job()
+        self.job_progress.setRange(0, 0)  # busy until the first progress report
+        self.job_progress.show()
+        self.cancel_job_btn.show()
+        self.statusBar().showMessage(f"{label}...")
+        self.job = self.jobs.submit(func, *args, on_result=on_result, on_error=on_error,
+                                    on_progress=self.job_progressed,
+                                    on_cancelled=lambda: self.statusBar().showMessage("Cancelled", 3000),
+                                    on_finished=self.job_finished)
+
+    def job_progressed(self, done, total):
+        self.job_progress.setRange(0, total)
+        self.job_progress.setValue(done)
+
+    def job_finished(self):
+        if self.job is not None and self.job not in self.jobs.active:
+            self.job = None
+            self.job_progress.hide()
+            self.cancel_job_btn.hide()
+            self.statusBar().clearMessage()
+
+    def cancel_job(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+            self.job_progress.hide()
+            self.cancel_job_btn.hide()
+
+    def closeEvent(self, event):
+        self.cancel_job()
+        if prime_pair_pool.started():
+            prime_pair_pool().warm(None)
+        super().closeEvent(event)
+
     def update_timer(self):
         self.time_elapsed += 1
         minutes = self.time_elapsed // 60
         seconds = self.time_elapsed % 60
-        print(f"[DEBUG] Timer running: {minutes}:{seconds}")  # Check if this prints endlessly
         self.setWindowTitle(f"RSA Game - Time: {minutes:02}:{seconds:02}")
 
 # Time Attack Game Class (from ui.py)
 class TimeAttackGame(QMainWindow):
+    # Emitted (from the writer thread, delivered on the GUI thread) once a
+    # submitted score is committed; carries the error or None
+    score_saved = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("RSA Game - Time Attack Mode")
@@ -524,30 +1007,44 @@ class TimeAttackGame(QMainWindow):
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
 
-        self.start_time = None
         self.time_taken = 0
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_timer)
+        self.score_saved.connect(self.on_score_saved)
 
-        # Game variables
-        self.p = self.q = self.n = 0
-        self.phi = self.e = self.d = 0
+        # Game variables; the rules live in the TimeAttackSession
+        self.session = None
         self.player_name = ""
         self.difficulty = ""
-        self.current_question = 0  
 
-        # Pages
+        # The leaderboard is opened on first use rather than at app startup
+        setup_database()
+        # Start filling the challenge pool while the player types their name
+        self.challenges = challenge_pool()
+
+        # Pages; the game and leaderboard pages are built on first visit
+        self._pages = {}
         self.start_page = self.create_start_page()
-        self.game_page = self.create_game_page()
-        self.leaderboard_page = self.create_leaderboard_page()
-        
         self.stack.addWidget(self.start_page)
-        self.stack.addWidget(self.game_page)
-        self.stack.addWidget(self.leaderboard_page)
+
+    def _page(self, name, factory):
+        page = self._pages.get(name)
+        if page is None:
+            page = self._pages[name] = factory()
+            self.stack.addWidget(page)
+        return page
+
+    @property
+    def game_page(self):
+        return self._page('game', self.create_game_page)
+
+    @property
+    def leaderboard_page(self):
+        return self._page('leaderboard', self.create_leaderboard_page)
     
     def create_start_page(self):
         """Create the start page UI"""
-        widget = QWidget()
+        widget = ThemedScreen()
         layout = QVBoxLayout()
 
         self.name_input = QLineEdit()
@@ -576,12 +1073,11 @@ class TimeAttackGame(QMainWindow):
         layout.addWidget(leaderboard_btn)
 
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         return widget
     
     def create_game_page(self):
         """Create the game page UI"""
-        widget = QWidget()
+        widget = ThemedScreen()
         layout = QVBoxLayout()
 
         self.question_label = QLabel("")
@@ -600,27 +1096,23 @@ class TimeAttackGame(QMainWindow):
         layout.addWidget(submit_btn)
 
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         return widget
 
     def create_leaderboard_page(self):
         """Create the leaderboard page UI"""
-        widget = QWidget()
+        widget = ThemedScreen()
         layout = QVBoxLayout()
 
-        self.leaderboard_table = QTableWidget()
-        self.leaderboard_table.setColumnCount(3)
-        self.leaderboard_table.setHorizontalHeaderLabels(["Player", "Difficulty", "Time (s)"])
+        self.leaderboard_view = LeaderboardView()
 
         back_btn = QPushButton("Back to Menu")
         back_btn.clicked.connect(self.reset_game)
 
-        layout.addWidget(QLabel("Leaderboard - Top 5 Scores"))
-        layout.addWidget(self.leaderboard_table)
+        layout.addWidget(QLabel("Leaderboard - Fastest Times"))
+        layout.addWidget(self.leaderboard_view)
         layout.addWidget(back_btn)
 
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         return widget
 
     def start_game(self):
@@ -632,88 +1124,64 @@ class TimeAttackGame(QMainWindow):
             QMessageBox.warning(self, "Input Error", "Please enter your name.")
             return
 
-        self.generate_challenge()
-        self.start_time = time.time()
+        page = self.game_page
+        self.session = TimeAttackSession(self.player_name, self.difficulty,
+                                         self.challenges.take(self.difficulty))
         self.timer.start(1000)
-        self.current_question = 0
         self.ask_question()
 
-        self.stack.setCurrentWidget(self.game_page)
-
-    def generate_challenge(self):
-        """Generate RSA parameters"""
-        if self.difficulty == "easy":
-            self.p, self.q = 5, 7
-        elif self.difficulty == "medium":
-            self.p, self.q = 11, 13
-        elif self.difficulty == "hard":
-            self.p, self.q = 17, 19
-
-        self.n = self.p * self.q
-        self.phi = (self.p - 1) * (self.q - 1)
-        self.e = self.find_coprime(self.phi)
-        self.d = pow(self.e, -1, self.phi)
+        self.stack.setCurrentWidget(page)
 
     def update_timer(self):
         """Update the timer every second"""
-        elapsed_time = int(time.time() - self.start_time)
-        self.time_label.setText(f"Time: {elapsed_time} seconds")
-
-
-    def find_coprime(self, phi):
-        """Find a small prime number e that is coprime to φ(n)"""
-        for e in range(3, phi, 2):
-            if math.gcd(e, phi) == 1:
-                return e
-        return 3  
+        self.time_label.setText(f"Time: {self.session.time_taken} seconds")
 
     def ask_question(self):
         """Ask the next question"""
-        questions = [
-            f"If p = {self.p} and q = {self.q}, find n (n = p * q):",
-            f"Find e such that 1 < e < φ(n) and gcd(e, φ(n)) = 1. (φ(n) = {self.phi})",
-            f"Find d such that d = e⁻¹ mod φ(n). (e = {self.e}, φ(n) = {self.phi})"
-        ]
-        self.question_label.setText(questions[self.current_question])
+        self.question_label.setText(self.session.question)
 
     def submit_answer(self):
         """Check answer and proceed to next question"""
-        correct_answers = [self.n, self.e, self.d]
-        
         try:
             user_answer = int(self.answer_input.text())
-            if user_answer == correct_answers[self.current_question]:
-                self.current_question += 1
-                if self.current_question < 3:
-                    self.ask_question()
-                    self.answer_input.clear()
-                else:
-                    self.time_taken = int(time.time() - self.start_time)
-                    self.timer.stop()
-                    add_score(self.player_name, self.difficulty, self.time_taken)
-                    QMessageBox.information(self, "Success!", f"You completed all questions in {self.time_taken} seconds.")
-                    self.reset_game()
-            else:
-                QMessageBox.warning(self, "Incorrect!", "Try again!")
         except ValueError:
             QMessageBox.warning(self, "Input Error", "Please enter a valid number.")
+            return
+
+        result = self.session.submit(user_answer)
+        if result == INCORRECT:
+            QMessageBox.warning(self, "Incorrect!", "Try again!")
+        elif result == CORRECT:
+            self.ask_question()
+            self.answer_input.clear()
+        else:
+            self.time_taken = self.session.time_taken
+            self.timer.stop()
+            tracing.event("time_attack.finished", difficulty=self.difficulty, seconds=self.time_taken)
+            self.session.save_score(callback=lambda score, error: self.score_saved.emit(error))
+            QMessageBox.information(self, "Success!", f"You completed all questions in {self.time_taken} seconds.")
+            self.reset_game()
+
+    def on_score_saved(self, error):
+        """Report the background commit of the last score"""
+        if error is not None:
+            QMessageBox.warning(self, "Leaderboard Error", f"Your score could not be saved: {error}")
+            return
+        self.statusBar().showMessage("Score saved to leaderboard", 3000)
+        if self.stack.currentWidget() is self._pages.get('leaderboard'):
+            self.leaderboard_view.refresh()
 
     def show_leaderboard(self):
         """Display leaderboard"""
-        scores = get_top_scores()
-        self.leaderboard_table.setRowCount(len(scores))
-
-        for row, (name, difficulty, time) in enumerate(scores):
-            self.leaderboard_table.setItem(row, 0, QTableWidgetItem(name))
-            self.leaderboard_table.setItem(row, 1, QTableWidgetItem(difficulty))
-            self.leaderboard_table.setItem(row, 2, QTableWidgetItem(str(time)))
-
-        self.stack.setCurrentWidget(self.leaderboard_page)
+        page = self.leaderboard_page
+        self.leaderboard_view.refresh()
+        self.stack.setCurrentWidget(page)
 
     def reset_game(self):
         """Reset game to the start page"""
         self.name_input.clear()
-        self.answer_input.clear()
+        if 'game' in self._pages:
+            self.answer_input.clear()
         self.stack.setCurrentWidget(self.start_page)
 
 # Leaderboard Class
@@ -724,27 +1192,26 @@ class Leaderboard(QMainWindow):
         self.setGeometry(100, 100, 400, 300)
         layout = QVBoxLayout()
         
-        self.leaderboard_table = QTableWidget()
-        self.leaderboard_table.setColumnCount(3)
-        self.leaderboard_table.setHorizontalHeaderLabels(["Player", "Difficulty", "Time (s)"])
-        
-        scores = get_top_scores()
-        self.leaderboard_table.setRowCount(len(scores))
-        
-        for row, (name, difficulty, time) in enumerate(scores):
-            self.leaderboard_table.setItem(row, 0, QTableWidgetItem(name))
-            self.leaderboard_table.setItem(row, 1, QTableWidgetItem(difficulty))
-            self.leaderboard_table.setItem(row, 2, QTableWidgetItem(str(time)))
+        setup_database()
+        self.leaderboard_view = LeaderboardView()
         
-        layout.addWidget(self.leaderboard_table)
-        widget = QWidget()
+        layout.addWidget(self.leaderboard_view)
+        widget = ThemedScreen()
         widget.setLayout(layout)
-        apply_hacker_theme(widget)
         self.setCentralWidget(widget)
 
 if __name__ == "__main__":
-    setup_database()
+    startup = StartupTimer("RSA: The Game", _import_started) if StartupTimer.enabled() else None
+    if startup is not None:
+        startup.mark("import")
     app = QApplication(sys.argv)
+    apply_hacker_theme(app)
+    app.aboutToQuit.connect(close_pools)
+    if startup is not None:
+        startup.mark("QApplication")
     main_menu = MainMenu()
     main_menu.show()
+    if startup is not None:
+        startup.mark("main menu")
+        startup.watch(main_menu)
     sys.exit(app.exec_())
@@ -0,0 +1,536 @@
+"""Headless RSA engine used by the game.
+
+Everything in here is plain Python so it can be driven from scripts, servers
+and benchmarks without starting Qt. The GUI in rsa.py calls into this module.
+"""
+import random
+import time
+from array import array
+from collections import OrderedDict
+from math import gcd, lcm
+
+from primes import (DIFFICULTY_RANGES, small_factors, random_prime_pair,
+                    prime_pair_for_key)
+
+# Standard public exponent for real-size keys (the Fermat prime F4)
+DEFAULT_E = 65537
+
+
+def mod_inverse(e, phi):
+    """Return e⁻¹ mod φ, or None when e and φ are not coprime"""
+    try:
+        return pow(e, -1, phi)
+    except ValueError:
+        return None
+
+
+def phi_factors(p, q):
+    """Distinct prime factors of φ = (p-1)(q-1) plus any unfactored cofactor
+
+    p and q are known, so φ is factored through p-1 and q-1 separately, which
+    only needs trial division by the small-prime table.
+    """
+    factors = set()
+    cofactor = 1
+    for m in (p - 1, q - 1):
+        fs, rest = small_factors(m)
+        factors.update(fs)
+        cofactor *= rest
+    return sorted(factors), cofactor
+
+
+def _is_coprime(e, factors, cofactor):
+    for f in factors:
+        if e % f == 0:
+            return False
+    return cofactor == 1 or gcd(e, cofactor) == 1
+
+
+def coprime_exponents(phi, factors=None, cofactor=1, start=3):
+    """Lazily yield odd e in [start, φ) with gcd(e, φ) = 1, in increasing order
+
+    Pass the factorization from phi_factors to test each candidate with a few
+    small modulo operations; without it φ is factored here.
+    """
+    if factors is None:
+        factors, cofactor = small_factors(phi)
+    for e in range(start | 1, phi, 2):
+        if _is_coprime(e, factors, cofactor):
+            yield e
+
+
+def random_exponents(phi, k, factors=None, cofactor=1, rng=random):
+    """Return up to k distinct random public exponents in [3, φ), sorted"""
+    if factors is None:
+        factors, cofactor = small_factors(phi)
+    if phi <= 3:
+        return []
+    chosen = set()
+    for _ in range(64 * k):
+        if len(chosen) == k:
+            break
+        e = rng.randrange(3, phi)
+        if _is_coprime(e, factors, cofactor):
+            chosen.add(e)
+    return sorted(chosen)
+
+
+def encrypt_many(values, e, n):
+    """Encrypt a sequence of integers with the public key (e, n)"""
+    return [pow(m, e, n) for m in values]
+
+
+def decrypt_many(values, d, n):
+    """Decrypt a sequence of integers with the private exponent d"""
+    return [pow(c, d, n) for c in values]
+
+
+def encode_text(text):
+    """Map a string to the per-character integers the game encrypts"""
+    return [ord(c) for c in text]
+
+
+def decode_text(values):
+    """Inverse of encode_text"""
+    return ''.join(map(chr, values))
+
+
+# Byte length prefix written in front of block-packed messages
+BLOCK_HEADER_BYTES = 4
+
+
+def block_bits(n):
+    """Width in bits of the largest block that always stays below n"""
+    bits = n.bit_length() - 1
+    if bits < 1:
+        raise ValueError(f"Modulus n={n} is too small for block mode")
+    return bits
+
+
+def bytes_to_blocks(data, width):
+    """Cut bytes into width-bit integers, zero-padding the last one"""
+    if not data:
+        return []
+    bits = bin(int.from_bytes(data, 'big'))[2:].zfill(8 * len(data))
+    bits += '0' * (-len(bits) % width)
+    return [int(bits[i:i + width], 2) for i in range(0, len(bits), width)]
+
+
+def blocks_to_bytes(blocks, width):
+    """Inverse of bytes_to_blocks; trailing bits short of a whole byte are dropped"""
+    if any(b >> width for b in blocks):
+        raise ValueError("Ciphertext is not a block-packed message")
+    bits = ''.join(format(b, f'0{width}b') for b in blocks)
+    size = len(bits) // 8
+    if not size:
+        return b''
+    return int(bits[:8 * size], 2).to_bytes(size, 'big')
+
+
+def pack_blocks(data, n):
+    """Pack bytes into integers below n, prefixed with the payload length
+
+    The framed message is read as one bit string and cut into
+    block_bits(n)-bit blocks, the last one zero-padded, so one modular
+    exponentiation covers as many bytes as the modulus allows.
+    """
+    framed = len(data).to_bytes(BLOCK_HEADER_BYTES, 'big') + bytes(data)
+    return bytes_to_blocks(framed, block_bits(n))
+
+
+def unpack_blocks(blocks, n):
+    """Inverse of pack_blocks; raises ValueError on a malformed frame"""
+    width = block_bits(n)
+    framed = blocks_to_bytes(blocks, width)
+    if len(framed) < BLOCK_HEADER_BYTES:
+        raise ValueError("Ciphertext is not a block-packed message")
+    length = int.from_bytes(framed[:BLOCK_HEADER_BYTES], 'big')
+    end = 8 * (BLOCK_HEADER_BYTES + length)
+    if end > len(blocks) * width or len(blocks) * width - end >= width:
+        raise ValueError("Ciphertext is not a block-packed message")
+    return framed[BLOCK_HEADER_BYTES:BLOCK_HEADER_BYTES + length]
+
+
+def block_count(length, n):
+    """Number of blocks pack_blocks makes from length payload bytes"""
+    return -(-8 * (BLOCK_HEADER_BYTES + length) // block_bits(n))
+
+
+def block_chunk_bytes(bits, target):
+    """About target bytes, rounded to a multiple of lcm(8, bits) bits
+
+    Cutting a framed message at such offsets makes every piece but the last
+    fill whole blocks, so pieces can be packed independently.
+    """
+    unit = lcm(8, bits) // 8
+    return unit * max(1, target // unit)
+
+
+def framed_pieces(data, chunk):
+    """Yield the length-prefixed payload in chunk-byte pieces"""
+    yield len(data).to_bytes(BLOCK_HEADER_BYTES, 'big') + data[:chunk - BLOCK_HEADER_BYTES]
+    for offset in range(chunk - BLOCK_HEADER_BYTES, len(data), chunk):
+        yield data[offset:offset + chunk]
+
+
+def iter_blocks(data, n, count):
+    """Yield pack_blocks(data, n) as lists of about count blocks, without building it whole"""
+    bits = block_bits(n)
+    for piece in framed_pieces(data, block_chunk_bytes(bits, count * bits // 8)):
+        yield bytes_to_blocks(piece, bits)
+
+
+def encode_blocks(text, n):
+    """UTF-8 encode text and pack it into blocks for modulus n"""
+    return pack_blocks(text.encode('utf-8'), n)
+
+
+def decode_blocks(values, n):
+    """Inverse of encode_blocks; undecodable bytes become U+FFFD"""
+    return unpack_blocks(values, n).decode('utf-8', errors='replace')
+
+
+def _typecode_for(n):
+    """Smallest unsigned array typecode that holds every value below n"""
+    for code in 'BHILQ':
+        if n - 1 < 1 << (8 * array(code).itemsize):
+            return code
+    return None
+
+
+class CipherBuffer:
+    """Compact storage for a ciphertext under modulus n
+
+    Values live in an array.array whose item size is picked from n, or in a
+    bytearray of fixed-width big-endian integers once n exceeds 64 bits,
+    instead of a list of boxed ints.
+    """
+
+    @classmethod
+    def allocate(cls, n, count):
+        """A zero-filled buffer of count values, to be filled in with write()"""
+        buffer = cls(n)
+        if buffer.typecode:
+            buffer._data = array(buffer.typecode, bytes(count * buffer.width))
+        else:
+            buffer._data = bytearray(count * buffer.width)
+        return buffer
+
+    def __init__(self, n, values=()):
+        self.n = n
+        self.typecode = _typecode_for(n)
+        if self.typecode:
+            self._data = array(self.typecode)
+            self.width = self._data.itemsize
+        else:
+            self._data = bytearray()
+            self.width = (n.bit_length() + 7) // 8
+        self.extend(values)
+
+    def __len__(self):
+        if self.typecode:
+            return len(self._data)
+        return len(self._data) // self.width
+
+    def __iter__(self):
+        if self.typecode:
+            return iter(self._data)
+        w = self.width
+        data = self._data
+        return (int.from_bytes(data[i:i + w], 'big') for i in range(0, len(data), w))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if self.typecode:
+                return self._data[index].tolist()
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if self.typecode:
+            return self._data[index]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CipherBuffer index out of range")
+        start = index * self.width
+        return int.from_bytes(self._data[start:start + self.width], 'big')
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"CipherBuffer(n={self.n}, len={len(self)})"
+
+    def append(self, value):
+        self.extend((value,))
+
+    def write(self, start, values):
+        """Overwrite values from index start on; returns the index after the last one"""
+        if self.typecode:
+            values = array(self.typecode, values)
+            end = start + len(values)
+            self._data[start:end] = values
+        else:
+            w = self.width
+            data = b''.join(v.to_bytes(w, 'big') for v in values)
+            end = start + len(data) // w
+            self._data[start * w:end * w] = data
+        return end
+
+    def extend(self, values):
+        if self.typecode:
+            self._data.extend(values)
+        else:
+            w = self.width
+            self._data += b''.join(v.to_bytes(w, 'big') for v in values)
+
+    @property
+    def nbytes(self):
+        return len(self._data) * (self._data.itemsize if self.typecode else 1)
+
+    def memoryview(self):
+        return memoryview(self._data)
+
+
+class Codebook:
+    """Lazily filled per-key lookup tables for character-wise encryption
+
+    Each plaintext value is exponentiated at most once per key. When both
+    e and d are known, every encryption also fills the reverse table, so
+    decrypting text encrypted in the same session is a pure lookup.
+    """
+
+    def __init__(self, n, e=None, d=None, decrypt=None):
+        self.n = n
+        self.e = e
+        self.d = d
+        self._decrypt = decrypt
+        self.encrypt_table = {}
+        self.decrypt_table = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.encrypt_table) + len(self.decrypt_table)
+
+    def encrypt_many(self, values):
+        table = self.encrypt_table
+        reverse = self.decrypt_table if self.d is not None else None
+        e, n = self.e, self.n
+        out = []
+        misses = 0
+        for m in values:
+            c = table.get(m)
+            if c is None:
+                c = table[m] = pow(m, e, n)
+                if reverse is not None:
+                    reverse.setdefault(c, m % n)
+                misses += 1
+            out.append(c)
+        self.misses += misses
+        self.hits += len(out) - misses
+        return out
+
+    def decrypt_many(self, values):
+        table = self.decrypt_table
+        decrypt = self._decrypt
+        d, n = self.d, self.n
+        out = []
+        misses = 0
+        for c in values:
+            m = table.get(c)
+            if m is None:
+                m = table[c] = decrypt(c) if decrypt else pow(c, d, n)
+                misses += 1
+            out.append(m)
+        self.misses += misses
+        self.hits += len(out) - misses
+        return out
+
+
+class CodebookCache:
+    """Size-bounded LRU of Codebooks keyed by (n, e, d)"""
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._books = OrderedDict()
+        self._retired_hits = 0
+        self._retired_misses = 0
+        self.evictions = 0
+
+    def get(self, n, e=None, d=None, decrypt=None):
+        key = (n, e, d)
+        book = self._books.get(key)
+        if book is not None:
+            self._books.move_to_end(key)
+            return book
+        book = self._books[key] = Codebook(n, e, d, decrypt)
+        while len(self._books) > self.maxsize:
+            _, old = self._books.popitem(last=False)
+            self._retired_hits += old.hits
+            self._retired_misses += old.misses
+            self.evictions += 1
+        return book
+
+    def clear(self):
+        self._books.clear()
+
+    def stats(self):
+        """Hit/miss counters summed over every codebook, evicted ones included"""
+        hits = self._retired_hits + sum(b.hits for b in self._books.values())
+        misses = self._retired_misses + sum(b.misses for b in self._books.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "codebooks": len(self._books),
+            "entries": sum(len(b) for b in self._books.values()),
+            "evictions": self.evictions,
+        }
+
+
+codebooks = CodebookCache()
+
+
+class RSAKey:
+    """An RSA key pair built from two (or more) primes
+
+    The CRT parameters dp = d mod (p-1), dq = d mod (q-1) and
+    qinv = q⁻¹ mod p are precomputed once, so decryption runs two
+    half-size exponentiations instead of one with the full modulus.
+    Extra primes give a multi-prime key (RFC 8017, section 3.2).
+    """
+
+    def __init__(self, p, q, e, d=None, extra_primes=()):
+        self.p = p
+        self.q = q
+        self.extra_primes = tuple(extra_primes)
+        self.n = p * q
+        self.phi = (p - 1) * (q - 1)
+        for r in self.extra_primes:
+            self.n *= r
+            self.phi *= r - 1
+        self.e = e
+        if d is None:
+            d = mod_inverse(e, self.phi)
+            if d is None:
+                raise ValueError(f"e={e} has no inverse modulo phi={self.phi}")
+        self.d = d
+        self.use_crt = True
+        self._precompute_crt()
+
+    def _precompute_crt(self):
+        # A zero residue is replaced by p-1 so that c ≡ 0 (mod p) still maps to 0
+        self.dp = self.d % (self.p - 1) or self.p - 1
+        self.dq = self.d % (self.q - 1) or self.q - 1
+        self.qinv = mod_inverse(self.q, self.p)
+        # (r_i, d_i, t_i) for each extra prime, where t_i is the inverse of
+        # the product of all earlier primes modulo r_i
+        self.crt_extra = []
+        product = self.p * self.q
+        for r in self.extra_primes:
+            t = mod_inverse(product, r)
+            if t is None:
+                self.qinv = None
+                break
+            self.crt_extra.append((r, self.d % (r - 1) or r - 1, t))
+            product *= r
+        if self.qinv is None:
+            # Repeated primes: the CRT split does not exist
+            self.use_crt = False
+
+    def __repr__(self):
+        return f"RSAKey(n={self.n}, e={self.e})"
+
+    @property
+    def public_key(self):
+        return self.e, self.n
+
+    @property
+    def private_key(self):
+        return self.d, self.n
+
+    def encrypt(self, m):
+        return pow(m, self.e, self.n)
+
+    def decrypt(self, c):
+        if self.use_crt:
+            return self.decrypt_crt(c)
+        return pow(c, self.d, self.n)
+
+    def decrypt_crt(self, c):
+        p, q = self.p, self.q
+        m1 = pow(c, self.dp, p)
+        m2 = pow(c, self.dq, q)
+        m = m2 + q * (self.qinv * (m1 - m2) % p)
+        product = p * q
+        for r, d_r, t in self.crt_extra:
+            m_r = pow(c, d_r, r)
+            m += product * ((m_r - m) * t % r)
+            product *= r
+        return m
+
+    def encrypt_many(self, values):
+        return encrypt_many(values, self.e, self.n)
+
+    def decrypt_many(self, values):
+        if not self.use_crt:
+            return decrypt_many(values, self.d, self.n)
+        if self.crt_extra:
+            return [self.decrypt_crt(c) for c in values]
+        p, q, dp, dq, qinv = self.p, self.q, self.dp, self.dq, self.qinv
+        out = []
+        for c in values:
+            m2 = pow(c, dq, q)
+            out.append(m2 + q * (qinv * (pow(c, dp, p) - m2) % p))
+        return out
+
+    @property
+    def codebook(self):
+        return codebooks.get(self.n, self.e, self.d, self.decrypt)
+
+    def encrypt_text(self, text):
+        return self.codebook.encrypt_many(encode_text(text))
+
+    def decrypt_text(self, ciphertext):
+        return decode_text(self.codebook.decrypt_many(ciphertext))
+
+    def encrypt_blocks(self, text):
+        return self.encrypt_many(encode_blocks(text, self.n))
+
+    def decrypt_blocks(self, ciphertext):
+        return decode_blocks(self.decrypt_many(ciphertext), self.n)
+
+
+def benchmark_decryption(key_bits=(1024, 2048), samples=200, rng=None):
+    """Time plain vs CRT decryption for each difficulty and key size
+
+    Returns {level: {"plain": seconds, "crt": seconds, "speedup": ratio}},
+    where the times cover decrypt_many over `samples` ciphertexts.
+    """
+    rng = rng or random.Random(0)
+    levels = {}
+    for difficulty, (lo, hi) in DIFFICULTY_RANGES.items():
+        levels[difficulty] = random_prime_pair(lo, hi, rng)
+    for bits in key_bits:
+        levels[f"{bits}-bit"] = prime_pair_for_key(bits, rng)
+
+    results = {}
+    for level, (p, q) in levels.items():
+        phi = (p - 1) * (q - 1)
+        e = 65537 if phi > 65537 and gcd(65537, phi) == 1 else next(coprime_exponents(phi))
+        key = RSAKey(p, q, e)
+        ciphertext = key.encrypt_many([rng.randrange(key.n) for _ in range(samples)])
+        timings = {}
+        for mode, use_crt in (("plain", False), ("crt", True)):
+            key.use_crt = use_crt
+            start = time.perf_counter()
+            key.decrypt_many(ciphertext)
+            timings[mode] = time.perf_counter() - start
+        timings["speedup"] = timings["plain"] / timings["crt"]
+        results[level] = timings
+    return results
+
+
+if __name__ == "__main__":
+    for level, t in benchmark_decryption().items():
+        print(f"{level:>10}: plain {t['plain'] * 1e3:9.2f} ms  crt {t['crt'] * 1e3:9.2f} ms  "
+              f"x{t['speedup']:.2f}")
@@ -0,0 +1,197 @@
+"""Multi-core batch encryption/decryption for large payloads.
+
+ParallelEngine fans chunks of work out over a process pool and hands the
+results back in order. The pool is created on first use and reused until
+close(). Its processes come from process_context(): forkserver where the
+platform has it, spawn otherwise, never fork, because the GUI process is
+already running Qt and background threads and a forked child can inherit
+a lock one of them holds. The factoring pool uses the same context.
+
+rsa_stream encrypts and decrypts block-mode files through an engine, and
+the GUI's jobs send real-size (Expert) modular exponentiation to the shared
+default_engine(), since pow() holds the GIL while it runs.
+
+    python rsa_parallel.py         # per-core scaling benchmark
+"""
+import multiprocessing
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from pools import shared
+from primes import prime_pair_for_key
+from rsa_engine import RSAKey, encrypt_many, decrypt_many, encode_blocks, decode_blocks
+
+# Below this many values a batch is processed inline; pool overhead would dominate
+MIN_PARALLEL_ITEMS = 256
+# Chunks per worker, so uneven chunks still balance out
+CHUNKS_PER_WORKER = 4
+
+# Keys rebuilt inside a worker process, keyed by their defining parameters
+_worker_keys = {}
+
+
+def process_context():
+    """The multiprocessing context every process pool in the game uses"""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def _key_params(key):
+    return key.p, key.q, key.e, key.d, key.extra_primes
+
+
+def _worker_key(params):
+    key = _worker_keys.get(params)
+    if key is None:
+        p, q, e, d, extra_primes = params
+        key = _worker_keys[params] = RSAKey(p, q, e, d, extra_primes)
+    return key
+
+
+def _encrypt_chunk(values, e, n):
+    return encrypt_many(values, e, n)
+
+
+def _decrypt_chunk(values, params):
+    return _worker_key(params).decrypt_many(values)
+
+
+class ParallelEngine:
+    """Process-pool backed encrypt_many/decrypt_many for one or more keys"""
+
+    def __init__(self, workers=None, min_parallel=MIN_PARALLEL_ITEMS):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=process_context())
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def submit(self, func, *args):
+        """Run func(*args) in a worker process; returns its Future"""
+        return self.pool.submit(func, *args)
+
+    def imap(self, func, chunks, *args):
+        """Yield func(chunk, *args) for each chunk, in order, computed in the pool
+
+        At most CHUNKS_PER_WORKER chunks per worker are in flight, so chunks
+        can come from a lazy iterator over a file of any size. Closing the
+        generator early cancels the chunks not yet started.
+        """
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(self.pool.submit(func, chunk, *args))
+                if len(pending) >= self.workers * CHUNKS_PER_WORKER:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def encrypt_chunks(self, key, chunks):
+        """Yield key.encrypt_many(chunk) for each chunk, computed in the pool"""
+        return self.imap(_encrypt_chunk, chunks, key.e, key.n)
+
+    def decrypt_chunks(self, key, chunks, d=None):
+        """Yield the decryption of each chunk, computed in the pool
+
+        Uses the key's own (CRT) path unless a different exponent d is given.
+        """
+        if d is None or d == key.d:
+            return self.imap(_decrypt_chunk, chunks, _key_params(key))
+        return self.imap(decrypt_many, chunks, d, key.n)
+
+    def chunk_size(self, count):
+        """Split count items into roughly CHUNKS_PER_WORKER chunks per worker"""
+        return max(1, -(-count // (self.workers * CHUNKS_PER_WORKER)))
+
+    def _run(self, func, values, *args):
+        values = list(values)
+        if len(values) < self.min_parallel or self.workers == 1:
+            return func(values, *args)
+        size = self.chunk_size(len(values))
+        out = []
+        for result in self.imap(func, (values[i:i + size] for i in range(0, len(values), size)), *args):
+            out.extend(result)
+        return out
+
+    def encrypt_many(self, key, values):
+        return self._run(_encrypt_chunk, values, key.e, key.n)
+
+    def decrypt_many(self, key, values):
+        values = list(values)
+        if len(values) < self.min_parallel or self.workers == 1:
+            return key.decrypt_many(values)
+        return self._run(_decrypt_chunk, values, _key_params(key))
+
+    def encrypt_blocks(self, key, text):
+        return self.encrypt_many(key, encode_blocks(text, key.n))
+
+    def decrypt_blocks(self, key, ciphertext):
+        return decode_blocks(self.decrypt_many(key, ciphertext), key.n)
+
+
+@shared
+def default_engine():
+    """Shared ParallelEngine with one worker per core; processes start on first use"""
+    return ParallelEngine()
+
+
+def benchmark_parallel(key_bits=2048, count=512, worker_counts=None, rng=None):
+    """Seconds to CRT-decrypt count values inline and with each worker count
+
+    Returns {workers: {'seconds', 'speedup'}}, where workers 0 is the inline
+    baseline and speedup is relative to it.
+    """
+    rng = rng or random.Random(1)
+    p, q = prime_pair_for_key(key_bits, rng)
+    key = RSAKey(p, q, 65537)
+    values = key.encrypt_many([rng.randrange(key.n) for _ in range(count)])
+    cpus = os.cpu_count() or 1
+    if worker_counts is None:
+        worker_counts = sorted({1 << i for i in range(cpus.bit_length())} | {cpus})
+    start = time.perf_counter()
+    expected = key.decrypt_many(values)
+    results = {0: {'seconds': time.perf_counter() - start}}
+    for workers in worker_counts:
+        with ParallelEngine(workers, min_parallel=0) as engine:
+            # Start the processes first; their startup isn't part of the work
+            list(engine.imap(_encrypt_chunk, [[2]] * workers, key.e, key.n))
+            size = engine.chunk_size(count)
+            start = time.perf_counter()
+            plain = []
+            for result in engine.imap(_decrypt_chunk, (values[i:i + size] for i in range(0, count, size)),
+                                      _key_params(key)):
+                plain.extend(result)
+            results[workers] = {'seconds': time.perf_counter() - start}
+        if plain != expected:
+            raise AssertionError(f"{workers} workers decrypted differently")
+    for result in results.values():
+        result['speedup'] = results[0]['seconds'] / result['seconds']
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{os.cpu_count()} cores, 512 CRT decryptions with a 2048-bit key")
+    for workers, stats in benchmark_parallel().items():
+        label = "inline" if workers == 0 else f"{workers} workers"
+        print(f"{label:<12} {stats['seconds'] * 1e3:10.1f} ms {stats['speedup']:6.2f}x")
@@ -0,0 +1,262 @@
+"""Streaming file encryption with a compact binary ciphertext format.
+
+Layout of a ciphertext file (all integers big-endian):
+
+    magic    4 bytes  b'RSAC'
+    version  1 byte
+    mode     1 byte   0 = per character (the GUI's Stage 3 default), 1 = block packed
+    width    2 bytes  bytes per ciphertext value, ceil(bits(n) / 8)
+    blockbit 4 bytes  block_bits(n) for block mode, 0 for per-character mode
+    length   8 bytes  plaintext length in UTF-8 bytes
+    n_len    2 bytes  followed by n
+    e_len    2 bytes  followed by e
+    values   width bytes each, until end of file
+
+The values are exactly what RSAGame.encrypt_message produces for the same
+key and mode, so GUI ciphertexts and file ciphertexts are interchangeable.
+Both directions read their input through mmap (plaintext for encryption,
+the ciphertext values for decryption) and process it chunk by chunk, so
+memory use does not grow with the file size. Given a ParallelEngine, block
+mode hands the chunks to its worker processes, one per core by default on
+the command line.
+"""
+import argparse
+import codecs
+import mmap
+import os
+import struct
+import sys
+from collections import namedtuple
+
+from rsa_engine import (BLOCK_HEADER_BYTES, RSAKey, block_bits, block_chunk_bytes,
+                        bytes_to_blocks, blocks_to_bytes, codebooks, decrypt_many, framed_pieces)
+from rsa_parallel import ParallelEngine
+
+MAGIC = b'RSAC'
+VERSION = 1
+MODE_CHAR = 0
+MODE_BLOCK = 1
+MODES = {"char": MODE_CHAR, "block": MODE_BLOCK}
+
+HEADER = struct.Struct('>4sBBHIQ')
+# Approximate number of plaintext bytes handled per chunk
+CHUNK_BYTES = 1 << 16
+
+CipherHeader = namedtuple('CipherHeader', 'mode width block_bits length n e')
+
+
+def value_width(n):
+    """Bytes needed to store any value below n"""
+    return (n.bit_length() + 7) // 8
+
+
+def _write_int(f, value):
+    data = value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big')
+    f.write(len(data).to_bytes(2, 'big'))
+    f.write(data)
+
+
+def _read_int(f):
+    size = int.from_bytes(f.read(2), 'big')
+    return int.from_bytes(f.read(size), 'big')
+
+
+def write_header(f, n, e, mode, length):
+    width = value_width(n)
+    bits = block_bits(n) if mode == MODE_BLOCK else 0
+    f.write(HEADER.pack(MAGIC, VERSION, mode, width, bits, length))
+    _write_int(f, n)
+    _write_int(f, e)
+    return CipherHeader(mode, width, bits, length, n, e)
+
+
+def read_header(f):
+    raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise ValueError("File is too short to be an RSA ciphertext")
+    magic, version, mode, width, bits, length = HEADER.unpack(raw)
+    if magic != MAGIC or version != VERSION or mode not in MODES.values():
+        raise ValueError("Not an RSA ciphertext file (bad magic, version or mode)")
+    n = _read_int(f)
+    e = _read_int(f)
+    if width != value_width(n):
+        raise ValueError("Ciphertext header is inconsistent")
+    return CipherHeader(mode, width, bits, length, n, e)
+
+
+def _write_values(f, values, width):
+    f.write(b''.join(v.to_bytes(width, 'big') for v in values))
+
+
+def _parse_values(chunk, width):
+    return [int.from_bytes(chunk[i:i + width], 'big') for i in range(0, len(chunk), width)]
+
+
+def _read_chunks(data, offset, width, count):
+    """Yield the raw bytes of at most count values at a time from data[offset:]"""
+    if (len(data) - offset) % width:
+        raise ValueError("Ciphertext file is truncated")
+    step = width * count
+    for start in range(offset, len(data), step):
+        yield data[start:start + step]
+
+
+def _mapped_chunks(f, width, count):
+    """_read_chunks over the rest of file f, read through mmap"""
+    offset = f.tell()
+    return _read_chunks(_map_file(f), offset, width, count)
+
+
+def _map_file(f):
+    """Return a read-only memory map of f, or b'' for an empty file"""
+    if not f.seek(0, 2):
+        return b''
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _encrypt_piece(piece, bits, e, n, width):
+    """Ciphertext bytes for one framed piece of plaintext"""
+    return b''.join(pow(b, e, n).to_bytes(width, 'big') for b in bytes_to_blocks(piece, bits))
+
+
+def _decrypt_chunk(chunk, width, bits, d, n, primes):
+    """Plaintext bytes for the raw ciphertext values in chunk"""
+    values = _parse_values(chunk, width)
+    if primes is not None:
+        p, q, e = primes
+        plain = RSAKey(p, q, e, d).decrypt_many(values)
+    else:
+        plain = decrypt_many(values, d, n)
+    return blocks_to_bytes(plain, bits)
+
+
+def _map(engine, func, chunks, *args):
+    """func(chunk, *args) for each chunk, in order; on engine's processes when given"""
+    if engine is None:
+        return (func(chunk, *args) for chunk in chunks)
+    return engine.imap(func, chunks, *args)
+
+
+def encrypt_stream(src, dst, n, e, mode=MODE_BLOCK, engine=None):
+    """Encrypt the file object src into dst; returns the header written
+
+    Block mode runs on engine's worker processes when an engine is given.
+    """
+    data = _map_file(src)
+    header = write_header(dst, n, e, mode, len(data))
+    if mode == MODE_BLOCK:
+        pieces = framed_pieces(data, block_chunk_bytes(header.block_bits, CHUNK_BYTES))
+        for out in _map(engine, _encrypt_piece, pieces, header.block_bits, e, n, header.width):
+            dst.write(out)
+    else:
+        book = codebooks.get(n, e)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for offset in range(0, len(data), CHUNK_BYTES):
+            text = decoder.decode(data[offset:offset + CHUNK_BYTES])
+            _write_values(dst, book.encrypt_many(map(ord, text)), header.width)
+        decoder.decode(b'', final=True)
+    return header
+
+
+def decrypt_stream(src, dst, d, p=None, q=None, engine=None):
+    """Decrypt the ciphertext file object src into dst; returns its header
+
+    Passing the primes p and q enables CRT decryption. Block mode runs on
+    engine's worker processes when an engine is given.
+    """
+    header = read_header(src)
+    n = header.n
+    if p is not None and q is not None:
+        if p * q != n:
+            raise ValueError("p * q does not match the modulus in the file")
+        key = RSAKey(p, q, header.e, d)
+    else:
+        key = None
+    written = 0
+    if header.mode == MODE_BLOCK:
+        bits = header.block_bits
+        count = block_chunk_bytes(bits, CHUNK_BYTES) * 8 // bits
+        primes = (p, q, header.e) if key is not None else None
+        chunks = _mapped_chunks(src, header.width, count)
+        first = True
+        for data in _map(engine, _decrypt_chunk, chunks, header.width, bits, d, n, primes):
+            if first:
+                if int.from_bytes(data[:BLOCK_HEADER_BYTES], 'big') != header.length:
+                    raise ValueError("Decrypted frame does not match the header (wrong key?)")
+                data = data[BLOCK_HEADER_BYTES:]
+                first = False
+            data = data[:header.length - written]
+            dst.write(data)
+            written += len(data)
+    else:
+        book = codebooks.get(n, d=d, decrypt=key.decrypt if key is not None else None)
+        for chunk in _mapped_chunks(src, header.width, CHUNK_BYTES):
+            values = _parse_values(chunk, header.width)
+            data = ''.join(map(chr, book.decrypt_many(values))).encode('utf-8', errors='replace')
+            dst.write(data)
+            written += len(data)
+    if written != header.length:
+        raise ValueError("Decrypted length does not match the header (wrong key?)")
+    return header
+
+
+def save_ciphertext(path, values, n, e, mode, length):
+    """Write an in-memory ciphertext (e.g. RSAGame.ciphertext) to path"""
+    with open(path, 'wb') as f:
+        header = write_header(f, n, e, mode, length)
+        _write_values(f, values, header.width)
+
+
+def load_ciphertext(path):
+    """Read a ciphertext file fully; returns (header, values)"""
+    with open(path, 'rb') as f:
+        header = read_header(f)
+        values = []
+        for chunk in _mapped_chunks(f, header.width, CHUNK_BYTES):
+            values.extend(_parse_values(chunk, header.width))
+    return header, values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encrypt or decrypt files with an RSA key")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    enc = sub.add_parser('encrypt', help="Encrypt a file")
+    enc.add_argument('-n', type=int, required=True, help="Modulus n")
+    enc.add_argument('-e', type=int, required=True, help="Public exponent e")
+    enc.add_argument('--mode', choices=sorted(MODES), default='block')
+    enc.add_argument('input')
+    enc.add_argument('output')
+
+    dec = sub.add_parser('decrypt', help="Decrypt a file")
+    dec.add_argument('-d', type=int, required=True, help="Private exponent d")
+    dec.add_argument('-p', type=int, help="First prime (enables CRT decryption)")
+    dec.add_argument('-q', type=int, help="Second prime (enables CRT decryption)")
+    dec.add_argument('input')
+    dec.add_argument('output')
+
+    for command in (enc, dec):
+        command.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                             help="Processes for block mode (default: one per core)")
+
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    engine = ParallelEngine(args.workers) if args.workers > 1 else None
+    try:
+        with open(args.input, 'rb') as src, open(args.output, 'wb') as dst:
+            if args.command == 'encrypt':
+                encrypt_stream(src, dst, args.n, args.e, MODES[args.mode], engine)
+            else:
+                decrypt_stream(src, dst, args.d, args.p, args.q, engine)
+    except (OSError, ValueError) as ex:
+        print(f"Error: {ex}", file=sys.stderr)
+        return 1
+    finally:
+        if engine is not None:
+            engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+from bench_leaderboard import compare
+
+
+def report(*results):
+    return {"benchmark": "leaderboard", "results": list(results)}
+
+
+def result(rows, fill=1000.0, p50=1.0, load=5.0, consistent=True):
+    return {"rows": rows, "fill_rows_per_s": fill, "top5_uncached": {"p50_ms": p50, "p99_ms": 2.0},
+            "top_cache_load_ms": load, "cache_consistent": consistent}
+
+
+def flagged(regressions):
+    return {(r["rows"], r["metric"]) for r in regressions}
+
+
+def test_throughput_drop_is_a_regression():
+    regressions = compare(report(result(100, fill=700.0)), report(result(100)), 0.2)
+    assert regressions == [{"rows": 100, "metric": "fill_rows_per_s", "baseline": 1000.0,
+                            "current": 700.0}]
+    # Faster is never flagged
+    assert compare(report(result(100, fill=5000.0)), report(result(100)), 0.2) == []
+
+
+def test_latency_rise_is_a_regression():
+    regressions = compare(report(result(100, p50=1.5)), report(result(100)), 0.2)
+    assert flagged(regressions) == {(100, "top5_uncached.p50_ms")}
+    assert compare(report(result(100, p50=0.1)), report(result(100)), 0.2) == []
+
+
+def test_changes_within_tolerance_pass():
+    current = report(result(100, fill=850.0, p50=1.15, load=5.9, consistent=False))
+    assert compare(current, report(result(100)), 0.2) == []
+
+
+def test_zero_baselines_and_missing_sizes_are_skipped():
+    baseline = report(result(100, load=0.0), result(1000))
+    current = report(result(100, load=50.0), result(10000, fill=1.0, p50=99.0))
+    assert compare(current, baseline, 0.2) == []
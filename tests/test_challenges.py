@@ -0,0 +1,55 @@
+import math
+import random
+
+import pytest
+
+from challenges import (TIME_ATTACK_RANGES, ChallengePool, generate_challenges, main,
+                        write_challenges)
+
+
+def check(challenge):
+    lo, hi = TIME_ATTACK_RANGES[challenge.difficulty]
+    assert lo <= challenge.p <= hi and lo <= challenge.q <= hi and challenge.p != challenge.q
+    assert challenge.n == challenge.p * challenge.q
+    assert challenge.phi == (challenge.p - 1) * (challenge.q - 1)
+    assert challenge.e * challenge.d % challenge.phi == 1
+    # e is the smallest valid exponent, the one the question expects
+    assert math.gcd(challenge.e, challenge.phi) == 1
+    assert all(math.gcd(e, challenge.phi) > 1 for e in range(2, challenge.e))
+
+
+def test_every_challenge_is_a_valid_key():
+    challenges = list(generate_challenges(600, rng=random.Random(0)))
+    assert {c.difficulty for c in challenges} == set(TIME_ATTACK_RANGES)
+    for challenge in challenges:
+        check(challenge)
+        assert challenge.answers == (challenge.n, challenge.e, challenge.d)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_same_seed_writes_the_same_file(tmp_path, suffix):
+    paths = [tmp_path / f"{name}{suffix}" for name in ("a", "b", "c")]
+    write_challenges(str(paths[0]), 200, seed=7)
+    write_challenges(str(paths[1]), 200, seed=7)
+    write_challenges(str(paths[2]), 200, seed=8)
+    assert paths[0].read_bytes() == paths[1].read_bytes()
+    assert paths[0].read_bytes() != paths[2].read_bytes()
+
+
+def test_unsupported_files_are_refused(tmp_path, capsys):
+    with pytest.raises(ValueError):
+        write_challenges(str(tmp_path / 'challenges.json'), 10)
+    assert main(['10', str(tmp_path / 'challenges.txt')]) == 1
+    assert "Unsupported" in capsys.readouterr().err
+
+
+def test_empty_pool_makes_a_challenge_on_the_spot():
+    pool = ChallengePool(("hard",), size=0, rng=random.Random(1))
+    try:
+        challenge = pool.take("hard")
+        assert pool.ready("hard") == 0
+        check(challenge)
+        with pytest.raises(ValueError):
+            pool.take("easy")
+    finally:
+        pool.close()
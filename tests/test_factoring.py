@@ -0,0 +1,127 @@
+import math
+import random
+import time
+
+import pytest
+
+from factoring import (FERMAT, RHO, TRIAL, FactoringTimeout, RhoPool, crack_key, factorize, fermat,
+                       pollard_brent, rho_pool, totient, trial_division)
+from primes import DIFFICULTY_RANGES, random_prime_bits, random_prime_pair
+from rsa_engine import RSAKey
+
+
+@pytest.fixture(scope='module', autouse=True)
+def close_pool():
+    yield
+    rho_pool().close()
+
+
+def test_trial_division():
+    assert trial_division(2 ** 5 * 3 * 9973 ** 2) == ([2, 2, 2, 2, 2, 3, 9973, 9973], 1)
+    big = 1000003 * 1000033
+    assert trial_division(7 * big) == ([7], big)
+
+
+def test_fermat_finds_close_primes():
+    p = random_prime_bits(64, random.Random(1))
+    q = next(n for n in range(p + 2, p + 10000, 2) if pow(2, n - 1, n) == 1)
+    assert fermat(p * q) in (p, q)
+    assert fermat(p * p) == p
+
+
+def test_pollard_brent_splits_a_semiprime():
+    rng = random.Random(2)
+    p, q = random_prime_bits(24, rng), random_prime_bits(24, rng)
+    factor = None
+    for c in range(1, 20):
+        factor = pollard_brent(p * q, c)
+        if factor:
+            break
+    assert factor in (p, q)
+
+
+@pytest.mark.parametrize("difficulty", sorted(DIFFICULTY_RANGES))
+def test_game_keys_fall_to_trial_division(difficulty):
+    rng = random.Random(3)
+    for _ in range(20):
+        p, q = random_prime_pair(*DIFFICULTY_RANGES[difficulty], rng)
+        result = factorize(p * q)
+        assert result.factors == sorted((p, q))
+        assert result.tiers == (TRIAL,)
+
+
+def test_close_primes_use_fermat():
+    p = random_prime_bits(100, random.Random(4))
+    q = next(n for n in range(p + 2, p + 100000, 2) if pow(2, n - 1, n) == 1 and pow(3, n - 1, n) == 1)
+    assert factorize(p * q).tiers == (FERMAT,)
+
+
+def test_64_bit_semiprime_within_budget():
+    rng = random.Random(5)
+    p, q = random_prime_bits(32, rng), random_prime_bits(32, rng)
+    result = factorize(p * q, budget=30, rng=rng)
+    assert result.factors == sorted((p, q))
+    assert RHO in result.tiers
+
+
+def test_mixed_factorization():
+    rng = random.Random(6)
+    big = random_prime_bits(30, rng)
+    n = 2 ** 3 * 9973 * big ** 3 * random_prime_bits(28, rng)
+    result = factorize(n, budget=30, rng=rng)
+    assert math.prod(result.factors) == n
+    assert result.factors == sorted(result.factors)
+    assert result.factors.count(big) == 3
+
+
+def test_parallel_race():
+    rng = random.Random(7)
+    p, q = random_prime_bits(30, rng), random_prime_bits(30, rng)
+    pool = RhoPool(workers=2)
+    try:
+        assert pool.split(p * q, time.monotonic() + 30, rng=rng) in (p, q)
+    finally:
+        pool.close()
+
+
+def test_budget_is_enforced():
+    rng = random.Random(8)
+    n = random_prime_bits(100, rng) * random_prime_bits(100, rng)
+    start = time.monotonic()
+    with pytest.raises(FactoringTimeout):
+        factorize(n, budget=0.3, rng=rng)
+    assert time.monotonic() - start < 5
+
+
+def test_check_can_cancel():
+    class Cancelled(Exception):
+        pass
+
+    def check():
+        raise Cancelled()
+
+    n = random_prime_bits(100, random.Random(9)) * random_prime_bits(100, random.Random(10))
+    with pytest.raises(Cancelled):
+        factorize(n, check=check)
+
+
+def test_crack_key_recovers_a_working_private_exponent():
+    key = RSAKey(1009, 1013, 65537)
+    cracked = crack_key(key.n, key.e)
+    assert cracked.factors == [1009, 1013]
+    assert cracked.phi == totient(cracked.factors) == key.phi
+    assert [pow(c, cracked.d, key.n) for c in key.encrypt_many([42, 4242])] == [42, 4242]
+
+
+def test_crack_key_rejects_invalid_keys():
+    with pytest.raises(ValueError):
+        crack_key(10007, 3)
+    with pytest.raises(ValueError):
+        crack_key(1009 * 1013, 3)  # 3 divides φ(n)
+    with pytest.raises(ValueError):
+        factorize(1)
+
+
+def test_totient():
+    assert totient([2, 2, 3]) == 4
+    assert totient([61, 53]) == 3120
@@ -0,0 +1,171 @@
+import json
+import random
+import threading
+
+import pytest
+
+import leaderboard
+from leaderboard import LeaderboardStore, ScoreWriter, main
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LeaderboardStore(str(tmp_path / 'scores.db'))
+    store.setup()
+    yield store
+    store.close()
+
+
+def random_scores(count, seed=0, players=20):
+    rng = random.Random(seed)
+    return [(f"p{rng.randrange(players)}", rng.choice(DIFFICULTIES), rng.randrange(1, 60))
+            for _ in range(count)]
+
+
+def all_pages(store, difficulty=None, limit=7):
+    rows, after = [], None
+    while True:
+        page = store.page(difficulty, after, limit, use_cache=False)
+        if not page:
+            return rows
+        rows += page
+        after = (page[-1][3], page[-1][0])
+
+
+def test_setup_is_idempotent(store):
+    store.add_score("neo", "easy", 10)
+    store.setup()
+    assert store.count() == 1
+
+
+def test_top_scores(store):
+    store.add_scores([("a", "easy", 30), ("b", "hard", 5), ("c", "easy", 12)])
+    assert store.top_scores(2) == [("b", "hard", 5), ("c", "easy", 12)]
+    assert store.top_scores(5, "easy") == [("c", "easy", 12), ("a", "easy", 30)]
+
+
+def test_keyset_pages_cover_every_row_once_in_order(store):
+    store.add_scores(random_scores(500))
+    for difficulty in (None,) + DIFFICULTIES:
+        rows = all_pages(store, difficulty)
+        assert len(rows) == store.count(difficulty)
+        assert len({row[0] for row in rows}) == len(rows)
+        assert rows == sorted(rows, key=lambda row: (row[3], row[0]))
+        assert all(difficulty in (None, row[2]) for row in rows)
+
+
+def test_top_cache_stays_consistent_through_inserts(store):
+    store.add_scores(random_scores(300, seed=1))
+    cache = store.enable_top_cache(size=20)
+    for seed in range(2, 6):
+        store.add_scores(random_scores(50, seed=seed))
+        store.add_score("fast", "easy", 0)
+    assert cache.verify(store) == []
+    for difficulty in (None,) + DIFFICULTIES:
+        assert store.page(difficulty, None, 20) == store.page(difficulty, None, 20, use_cache=False)
+        assert store.top_scores(5, difficulty) == [row[1:] for row in store.page(difficulty, None, 5, use_cache=False)]
+
+
+def test_top_cache_verify_reports_drift(store):
+    store.add_scores(random_scores(100, seed=7))
+    cache = store.enable_top_cache(size=10)
+    with store.connection() as conn:
+        conn.execute("DELETE FROM leaderboard WHERE difficulty = 'hard'")
+    assert set(cache.verify(store)) == {None, "hard"}
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_export_import_round_trip(store, tmp_path, suffix):
+    scores = random_scores(250, seed=3)
+    store.add_scores(scores)
+    path = str(tmp_path / f"scores{suffix}")
+    assert store.export_file(path) == 250
+    other = LeaderboardStore(str(tmp_path / 'other.db'))
+    other.setup()
+    try:
+        assert other.import_file(path) == 250
+        assert [row[1:] for row in all_pages(other)] == [row[1:] for row in all_pages(store)]
+    finally:
+        other.close()
+
+
+def test_failed_import_changes_nothing(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(leaderboard, 'BULK_BATCH', 10)
+    store.add_scores(random_scores(5, seed=8))
+    cache = store.enable_top_cache(size=10)
+    lines = [json.dumps({'player_name': name, 'difficulty': d, 'time': t})
+             for name, d, t in random_scores(30, seed=9)]
+    path = tmp_path / 'scores.jsonl'
+    path.write_text('\n'.join(lines[:24] + ['{"player_name": "x"}'] + lines[24:]))
+    with pytest.raises(ValueError, match="record 25"):
+        store.import_file(str(path))
+    assert store.count() == 5
+    path.write_text('\n'.join(lines))
+    assert store.import_file(str(path)) == 30
+    assert store.count() == 35
+    assert cache.verify(store) == []
+
+
+def test_json_array_files_are_refused(store, tmp_path):
+    with pytest.raises(ValueError, match="JSON Lines"):
+        store.export_file(str(tmp_path / 'scores.json'))
+    with pytest.raises(ValueError, match="Unsupported"):
+        store.import_file(str(tmp_path / 'scores.xml'))
+
+
+def test_merge_database(store, tmp_path):
+    other = LeaderboardStore(str(tmp_path / 'other.db'))
+    other.setup()
+    other.add_scores(random_scores(40, seed=4))
+    other.close()
+    store.add_scores(random_scores(10, seed=5))
+    cache = store.enable_top_cache(size=10)
+    assert store.merge_database(other.path) == 40
+    assert store.count() == 50
+    assert cache.verify(store) == []
+
+
+def test_compact_keeps_each_players_best_runs(store):
+    scores = random_scores(400, seed=6, players=5)
+    store.add_scores(scores)
+    removed = store.compact(keep=2)
+    best = {}
+    for name, difficulty, t in scores:
+        best.setdefault((name, difficulty), []).append(t)
+    expected = sorted(t for times in best.values() for t in sorted(times)[:2])
+    assert removed == len(scores) - len(expected)
+    assert sorted(row[3] for row in all_pages(store)) == expected
+
+
+def test_compact_refuses_to_empty_the_board(store, capsys):
+    store.add_scores(random_scores(10, seed=7))
+    with pytest.raises(ValueError):
+        store.compact(keep=0)
+    assert store.count() == 10
+    with pytest.raises(SystemExit):
+        main(['--db', store.path, 'compact', '--keep', '0'])
+    assert "--keep" in capsys.readouterr().err
+    assert store.count() == 10
+
+
+def test_score_writer_commits_and_calls_back(store):
+    writer = ScoreWriter(store, batch_size=16)
+    results = []
+    done = threading.Event()
+
+    def callback(score, error):
+        results.append((score, error))
+        if len(results) == 100:
+            done.set()
+
+    for name, difficulty, t in random_scores(100, seed=8):
+        writer.submit(name, difficulty, t, callback=callback)
+    writer.flush()
+    assert done.wait(5)
+    assert store.count() == 100
+    assert all(error is None for _, error in results)
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit("late", "easy", 1)
@@ -0,0 +1,50 @@
+import asyncio
+import socket
+
+import pytest
+
+from leaderboard import LeaderboardStore
+from leaderboard_server import LeaderboardClient, LeaderboardServer
+
+
+def test_client_round_trip_and_clean_close(tmp_path):
+    store = LeaderboardStore(str(tmp_path / 'scores.db'))
+    store.setup()
+    store.enable_top_cache()
+
+    async def scenario():
+        server = await LeaderboardServer(store, port=0).start()
+        client = LeaderboardClient(port=server.port)
+        scores = [(f"bot{i}", "easy", 100 - i) for i in range(50)] + [("neo", "hard", 7)]
+        await asyncio.to_thread(client.add_scores, scores)
+        top = await asyncio.to_thread(client.top_scores, 3)
+        page = await asyncio.to_thread(client.page, "easy", None, 10)
+        # Leave the client connected: close() must cancel its handler quietly
+        await server.close()
+        client.close()
+        await asyncio.sleep(0)
+        leftover = asyncio.all_tasks() - {asyncio.current_task()}
+        return top, page, leftover
+
+    loop = asyncio.new_event_loop()
+    errors = []
+    loop.set_exception_handler(lambda loop, context: errors.append(context))
+    try:
+        top, page, leftover = loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+        store.close()
+    assert top == [("neo", "hard", 7), ("bot49", "easy", 51), ("bot48", "easy", 52)]
+    assert [row[3] for row in page] == list(range(51, 61))
+    assert not leftover
+    assert errors == []
+
+
+def test_unreachable_server_raises_oserror():
+    # The leaderboard view catches OSError; nothing may escape as another type
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    client = LeaderboardClient(port=port, timeout=1)
+    with pytest.raises(OSError):
+        client.page("easy", None, 10)
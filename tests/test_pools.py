@@ -0,0 +1,88 @@
+import random
+import threading
+
+from pools import BackgroundPool, shared
+from primes import PrimePairPool
+
+
+class Counter(BackgroundPool):
+    def __init__(self, keys=(), size=4):
+        self.made = []
+        self.lock = threading.Lock()
+        super().__init__(keys, size)
+
+    def make(self, key):
+        with self.lock:
+            self.made.append(key)
+            return key, len(self.made)
+
+
+def wait_for(predicate):
+    for _ in range(1000):
+        if predicate():
+            return True
+        threading.Event().wait(0.005)
+    return False
+
+
+def test_fills_only_the_kept_keys():
+    pool = Counter(['a'], size=4)
+    assert wait_for(lambda: pool.ready('a') == 4)
+    pool.keep('b')
+    assert wait_for(lambda: pool.ready('b') == 4)
+    assert pool.ready('a') == 0
+    pool.close()
+    assert set(pool.made) == {'a', 'b'} and len(pool.made) == 8
+
+
+def test_take_refills_and_falls_back_when_empty():
+    pool = Counter(size=4)
+    assert pool.take('x')[0] == 'x'
+    assert pool.ready('x') == 0
+    pool.keep('x')
+    assert wait_for(lambda: pool.ready('x') == 4)
+    pool.take('x')
+    pool.take('x')
+    assert wait_for(lambda: pool.ready('x') == 4)
+    pool.close()
+
+
+def test_close_stops_the_filler():
+    pool = Counter(['a'], size=2)
+    pool.close(timeout=1)
+    assert not pool._thread.is_alive()
+    ready, made = pool.ready('a'), len(pool.made)
+    for _ in range(3):
+        pool.take('a')
+    threading.Event().wait(0.05)
+    # Only the takes that found the queue empty made anything
+    assert len(pool.made) == made + 3 - ready
+
+
+def test_shared_builds_once():
+    calls = []
+
+    @shared
+    def thing():
+        """A shared thing"""
+        calls.append(1)
+        return object()
+
+    assert thing.started() is None
+    assert thing() is thing()
+    assert thing.started() is thing()
+    assert len(calls) == 1
+    assert thing.__doc__ == "A shared thing"
+
+
+def test_prime_pair_pool_warms_one_size():
+    pool = PrimePairPool(size=2, rng=random.Random(3))
+    pool.warm(256)
+    assert wait_for(lambda: pool.ready(256) == 2)
+    pool.warm(512)
+    assert wait_for(lambda: pool.ready(512) == 2)
+    assert pool.ready(256) == 0
+    p, q = pool.take(512)
+    assert (p * q).bit_length() == 512
+    pool.warm(None)
+    pool.close()
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from primes import (DIFFICULTY_RANGES, MR_WITNESSES, SIEVE_LIMIT, _miller_rabin, expert_key_problem,
+                    is_prime, prime_in_range, prime_pair_for_key, primes_up_to, random_prime,
+                    random_prime_bits, random_prime_pair, small_factors)
+
+
+def trial_is_prime(n):
+    if n < 2:
+        return False
+    d = 2
+    while d * d <= n:
+        if n % d == 0:
+            return False
+        d += 1
+    return True
+
+
+def test_matches_trial_division_across_the_sieve_boundary():
+    for n in range(-5, 2 * SIEVE_LIMIT + 200):
+        assert is_prime(n) == trial_is_prime(n), n
+
+
+def test_primes_up_to_is_capped_at_the_sieve():
+    assert primes_up_to(30) == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    assert primes_up_to(10 ** 9)[-1] <= SIEVE_LIMIT
+
+
+@pytest.mark.parametrize("n", [
+    561, 1105, 41041, 825265,                  # Carmichael numbers
+    3215031751,                                # strong pseudoprime to bases 2, 3, 5, 7
+    3825123056546413051,                       # strong pseudoprime to bases 2 .. 23
+])
+def test_rejects_pseudoprimes(n):
+    assert not is_prime(n)
+
+
+@pytest.mark.parametrize("n", [318665857834031151167461, 3317044064679887385961981])
+def test_rejects_composites_that_fool_the_fixed_witnesses(n):
+    # Both pass Miller-Rabin for every base up to 37; Baillie-PSW must not
+    assert _miller_rabin(n, MR_WITNESSES)
+    assert not is_prime(n)
+
+
+@pytest.mark.parametrize("exponent, prime", [
+    (31, True), (61, True), (67, False), (89, True), (127, True), (521, True), (523, False),
+])
+def test_mersenne_numbers(exponent, prime):
+    assert is_prime(2 ** exponent - 1) == prime
+
+
+def test_rejects_products_of_large_primes():
+    rng = random.Random(1)
+    for bits in (40, 80, 256):
+        p = random_prime_bits(bits, rng)
+        q = random_prime_bits(bits, rng)
+        assert is_prime(p) and is_prime(q)
+        assert not is_prime(p * q)
+        assert not is_prime(p * p)
+
+
+def test_random_primes_have_the_requested_size():
+    rng = random.Random(2)
+    for bits in (8, 33, 64, 512):
+        p = random_prime_bits(bits, rng)
+        assert p.bit_length() == bits and is_prime(p)
+    assert 1000 <= random_prime(1000, 1100, rng) <= 1100
+    for key_bits in (64, 1024):
+        p, q = prime_pair_for_key(key_bits, rng)
+        assert p != q and (p * q).bit_length() == key_bits
+
+
+def test_random_pairs_stay_in_the_difficulty_range():
+    rng = random.Random(3)
+    for difficulty, (lo, hi) in DIFFICULTY_RANGES.items():
+        p, q = random_prime_pair(lo, hi, rng)
+        assert p != q
+        assert prime_in_range(p, difficulty) and prime_in_range(q, difficulty)
+
+
+def test_small_factors():
+    assert small_factors(2 ** 4 * 3 * 9973) == ([2, 3, 9973], 1)
+    big = 1000003 * 1000033
+    assert small_factors(6 * big) == ([2, 3], big)
+    assert small_factors(10 * 1000003) == ([2, 5, 1000003], 1)
+
+
+def test_expert_key_problem():
+    rng = random.Random(4)
+    p, q = prime_pair_for_key(1024, rng)
+    assert expert_key_problem(p, q) is None
+    assert "different" in expert_key_problem(p, p)
+    assert "bits" in expert_key_problem(11, 13)
+    assert "third" in expert_key_problem(3, random_prime_bits(1100, rng))
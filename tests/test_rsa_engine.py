@@ -0,0 +1,120 @@
+import random
+from itertools import islice
+from math import gcd
+
+import pytest
+
+from primes import prime_pair_for_key
+from rsa_engine import (CipherBuffer, CodebookCache, RSAKey, block_bits, block_count,
+                        coprime_exponents, decode_blocks, encode_blocks, iter_blocks, mod_inverse,
+                        pack_blocks, phi_factors, unpack_blocks)
+
+TEXT = "Hello, wörld! ✓ " * 40
+
+
+def test_textbook_key():
+    key = RSAKey(61, 53, 17)
+    assert (key.n, key.phi, key.d) == (3233, 3120, 2753)
+    assert key.encrypt_many([65]) == [2790]
+    assert key.decrypt_many([2790]) == [65]
+
+
+def test_mod_inverse():
+    assert mod_inverse(17, 3120) == 2753
+    assert mod_inverse(6, 3120) is None
+
+
+def test_coprime_exponents_are_ascending_and_valid():
+    p, q = 1009, 1013
+    phi = (p - 1) * (q - 1)
+    factors, cofactor = phi_factors(p, q)
+    found = list(islice(coprime_exponents(phi, factors, cofactor), 20))
+    assert found == sorted(found)
+    assert found == [e for e in range(3, found[-1] + 1) if gcd(e, phi) == 1][:20]
+    assert next(coprime_exponents(phi, factors, cofactor, start=65537)) >= 65537
+
+
+def test_crt_matches_plain_decryption_for_every_value():
+    key = RSAKey(101, 113, 3)
+    values = list(range(key.n))
+    assert key.decrypt_many(values) == [pow(c, key.d, key.n) for c in values]
+
+
+def test_multi_prime_key_round_trip():
+    key = RSAKey(1009, 1013, 65537, extra_primes=(1019,))
+    assert key.n == 1009 * 1013 * 1019
+    rng = random.Random(1)
+    # Include values divisible by each prime, where CRT residues are zero
+    values = [rng.randrange(key.n) for _ in range(200)] + [0, 1, 1009, 1013 * 1019, key.n - 1]
+    assert key.decrypt_many(key.encrypt_many(values)) == [m % key.n for m in values]
+
+
+def test_real_size_key_round_trip():
+    p, q = prime_pair_for_key(1024, random.Random(2))
+    key = RSAKey(p, q, 65537)
+    assert key.decrypt_blocks(key.encrypt_blocks(TEXT)) == TEXT
+
+
+@pytest.mark.parametrize("p, q", [(11, 13), (1009, 1013), (65537, 65539)])
+def test_text_and_block_round_trips(p, q):
+    key = RSAKey(p, q, next(coprime_exponents((p - 1) * (q - 1))))
+    # Per-character mode needs every code point below n; block mode never does
+    text = TEXT if key.n > max(map(ord, TEXT)) else "Hello!"
+    assert key.decrypt_text(key.encrypt_text(text)) == text
+    for text in ("", "a", TEXT):
+        assert key.decrypt_blocks(key.encrypt_blocks(text)) == text
+
+
+def test_block_framing():
+    n = 1009 * 1013
+    data = "framing ✓".encode('utf-8')
+    blocks = pack_blocks(data, n)
+    assert all(b < 1 << block_bits(n) for b in blocks)
+    assert len(blocks) == block_count(len(data), n)
+    assert unpack_blocks(blocks, n) == data
+    with pytest.raises(ValueError):
+        unpack_blocks(blocks[:1], n)
+    with pytest.raises(ValueError):
+        unpack_blocks(blocks + [0, 0, 0], n)
+    with pytest.raises(ValueError):
+        block_bits(1)
+
+
+@pytest.mark.parametrize("n", [1009 * 1013, (1 << 127) - 1])
+@pytest.mark.parametrize("count", [1, 4, 2048])
+def test_iter_blocks_matches_pack_blocks(n, count):
+    data = TEXT.encode('utf-8')
+    chunks = list(iter_blocks(data, n, count))
+    assert [b for chunk in chunks for b in chunk] == pack_blocks(data, n)
+    assert decode_blocks([b for chunk in chunks for b in chunk], n) == decode_blocks(encode_blocks(TEXT, n), n)
+
+
+@pytest.mark.parametrize("n, width", [(200, 1), (60000, 2), (3233 * 3233, 4), (1 << 64, 8),
+                                       ((1 << 64) + 1, 9)])
+def test_cipher_buffer(n, width):
+    values = [0, 1, n - 1, n // 2]
+    buffer = CipherBuffer(n, values)
+    assert buffer.width == width
+    assert (buffer.typecode is None) == (width > 8)
+    assert len(buffer) == 4 and list(buffer) == values
+    assert buffer[-1] == n // 2 and buffer[1:3] == [1, n - 1]
+    assert buffer == values
+    filled = CipherBuffer.allocate(n, 4)
+    assert list(filled) == [0, 0, 0, 0]
+    assert filled.write(0, values[:3]) == 3
+    assert filled.write(3, values[3:]) == 4
+    assert filled == buffer
+    assert filled.nbytes == 4 * buffer.width
+
+
+def test_codebook_cache_counts_hits_and_evicts():
+    cache = CodebookCache(maxsize=2)
+    book = cache.get(3233, 17, 2753)
+    assert book.encrypt_many([65, 65, 66]) == [2790, 2790, pow(66, 17, 3233)]
+    assert book.decrypt_many([2790]) == [65]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 2)
+    cache.get(1, 1)
+    cache.get(2, 1)
+    assert cache.stats()['evictions'] == 1
+    assert cache.get(3233, 17, 2753) is not book
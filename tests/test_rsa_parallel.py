@@ -0,0 +1,66 @@
+import io
+
+import pytest
+
+from rsa_engine import RSAKey
+from rsa_parallel import ParallelEngine, process_context
+from rsa_stream import CHUNK_BYTES, MODE_BLOCK, decrypt_stream, encrypt_stream
+
+KEY = RSAKey(1009, 1013, 65537)
+BIG_KEY = RSAKey(0xffffffffffffffc5, 0xffffffffffffff43, 65537)
+TEXT = ("parallel ✓ chunks " * (3 * CHUNK_BYTES // 16)).encode('utf-8')
+
+
+@pytest.fixture(scope='module')
+def engine():
+    with ParallelEngine(workers=2, min_parallel=0) as engine:
+        yield engine
+
+
+def test_never_forks():
+    assert process_context().get_start_method() in ('forkserver', 'spawn')
+
+
+@pytest.mark.parametrize("key", [KEY, BIG_KEY], ids=["game", "128-bit"])
+def test_round_trip_matches_inline(engine, key):
+    values = list(range(2, 1000))
+    ciphertext = engine.encrypt_many(key, values)
+    assert ciphertext == key.encrypt_many(values)
+    assert engine.decrypt_many(key, ciphertext) == values
+    text = "Parallel ✓ blocks " * 50
+    assert engine.decrypt_blocks(key, engine.encrypt_blocks(key, text)) == text
+
+
+def test_imap_keeps_order_and_stops_early(engine):
+    assert list(engine.imap(sum, ([i, i] for i in range(100)))) == [2 * i for i in range(100)]
+    results = engine.imap(sum, ([i] for i in range(100)))
+    assert next(results) == 0
+    results.close()
+
+
+def test_stream_round_trip_matches_inline(tmp_path, engine):
+    plain = tmp_path / 'plain.txt'
+    plain.write_bytes(TEXT)
+    outputs = []
+    for use in (None, engine):
+        out = io.BytesIO()
+        with open(plain, 'rb') as src:
+            encrypt_stream(src, out, KEY.n, KEY.e, MODE_BLOCK, use)
+        outputs.append(out.getvalue())
+    assert outputs[0] == outputs[1]
+    cipher = tmp_path / 'plain.rsac'
+    cipher.write_bytes(outputs[1])
+    for p, q in ((None, None), (KEY.p, KEY.q)):
+        out = io.BytesIO()
+        with open(cipher, 'rb') as src:
+            decrypt_stream(src, out, KEY.d, p, q, engine)
+        assert out.getvalue() == TEXT
+
+
+def test_decrypt_chunks_with_own_and_other_exponent(engine):
+    values = list(range(2, 200))
+    chunks = [values[i:i + 7] for i in range(0, len(values), 7)]
+    ciphertext = [BIG_KEY.encrypt_many(chunk) for chunk in chunks]
+    # d + φ is a different exponent that still decrypts, without CRT
+    for d in (None, BIG_KEY.d, BIG_KEY.d + BIG_KEY.phi):
+        assert list(engine.decrypt_chunks(BIG_KEY, ciphertext, d)) == chunks
@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from rsa_engine import RSAKey
+from rsa_stream import (CHUNK_BYTES, MODE_BLOCK, MODE_CHAR, decrypt_stream, encrypt_stream,
+                        load_ciphertext, main, read_header, save_ciphertext)
+
+KEY = RSAKey(1009, 1013, 65537)
+# Spans several chunks, with multi-byte characters straddling chunk edges
+TEXT = ("stream ✓ wörld " * (3 * CHUNK_BYTES // 16)).encode('utf-8')
+
+
+def encrypt_file(tmp_path, data, mode, key=KEY):
+    plain = tmp_path / 'plain.txt'
+    plain.write_bytes(data)
+    cipher = tmp_path / 'plain.rsac'
+    with open(plain, 'rb') as src, open(cipher, 'wb') as dst:
+        encrypt_stream(src, dst, key.n, key.e, mode)
+    return cipher
+
+
+def decrypt_file(path, d, p=None, q=None):
+    out = io.BytesIO()
+    with open(path, 'rb') as src:
+        decrypt_stream(src, out, d, p, q)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("mode", [MODE_CHAR, MODE_BLOCK])
+@pytest.mark.parametrize("data", [b"", b"x", TEXT])
+def test_round_trip(tmp_path, mode, data):
+    cipher = encrypt_file(tmp_path, data, mode)
+    assert decrypt_file(cipher, KEY.d) == data
+    assert decrypt_file(cipher, KEY.d, KEY.p, KEY.q) == data
+
+
+def test_block_values_match_the_engine(tmp_path):
+    text = "Block ✓ mode"
+    cipher = encrypt_file(tmp_path, text.encode('utf-8'), MODE_BLOCK)
+    header, values = load_ciphertext(cipher)
+    assert (header.n, header.e, header.mode) == (KEY.n, KEY.e, MODE_BLOCK)
+    assert values == KEY.encrypt_blocks(text)
+
+
+def test_saved_gui_ciphertext_decrypts(tmp_path):
+    text = "saved from Stage 4"
+    path = tmp_path / 'saved.rsac'
+    save_ciphertext(path, KEY.encrypt_text(text), KEY.n, KEY.e, MODE_CHAR, len(text.encode('utf-8')))
+    assert decrypt_file(path, KEY.d).decode('utf-8') == text
+
+
+def test_wrong_key_is_detected(tmp_path):
+    cipher = encrypt_file(tmp_path, TEXT[:1000], MODE_BLOCK)
+    with pytest.raises(ValueError):
+        decrypt_file(cipher, KEY.d + 2)
+    with pytest.raises(ValueError):
+        decrypt_file(cipher, KEY.d, 1009, 1019)
+
+
+def test_truncated_and_foreign_files_are_rejected(tmp_path):
+    cipher = encrypt_file(tmp_path, TEXT[:1000], MODE_BLOCK)
+    data = cipher.read_bytes()
+    cipher.write_bytes(data[:-1])
+    with pytest.raises(ValueError, match="truncated"):
+        decrypt_file(cipher, KEY.d)
+    with pytest.raises(ValueError):
+        read_header(io.BytesIO(b"PK\x03\x04" + data[4:]))
+    with pytest.raises(ValueError):
+        read_header(io.BytesIO(data[:5]))
+
+
+def test_cli(tmp_path, capsys):
+    plain = tmp_path / 'in.txt'
+    plain.write_bytes(TEXT[:5000])
+    cipher, out = tmp_path / 'in.rsac', tmp_path / 'out.txt'
+    assert main(['encrypt', '-n', str(KEY.n), '-e', str(KEY.e), str(plain), str(cipher)]) == 0
+    assert main(['decrypt', '-d', str(KEY.d), '-p', '1009', '-q', '1013', str(cipher), str(out)]) == 0
+    assert out.read_bytes() == plain.read_bytes()
+    assert main(['decrypt', '-d', '3', str(cipher), str(out)]) == 1
+    assert "Error" in capsys.readouterr().err
@@ -0,0 +1,71 @@
+import asyncio
+import random
+
+import pytest
+
+from bot_simulator import simulate
+from challenges import make_challenge
+from leaderboard import LeaderboardStore, ScoreWriter
+from time_attack import CORRECT, FINISHED, INCORRECT, QUESTIONS, TimeAttackSession
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def session(clock=None):
+    challenge = make_challenge("easy", random.Random(1))
+    return TimeAttackSession("neo", "easy", challenge, clock or Clock())
+
+
+def test_wrong_answer_counts_a_mistake_and_stays_on_the_question():
+    run = session()
+    question = run.question
+    assert run.submit(run.challenge.answers[0] + 1) == INCORRECT
+    assert (run.question_index, run.mistakes, run.question) == (0, 1, question)
+    assert run.submit(run.challenge.answers[0]) == CORRECT
+    assert run.question_index == 1
+
+
+def test_finishing_freezes_the_clock():
+    clock = Clock()
+    run = session(clock)
+    results = []
+    for answer in run.challenge.answers:
+        clock.now += 4.5
+        results.append(run.submit(answer))
+    assert results == [CORRECT] * (len(QUESTIONS) - 1) + [FINISHED]
+    clock.now += 60
+    assert run.elapsed() == 13.5
+    assert run.time_taken == 13
+
+
+def test_out_of_order_calls_raise():
+    run = session()
+    with pytest.raises(RuntimeError):
+        run.save_score()
+    for answer in run.challenge.answers:
+        run.submit(answer)
+    with pytest.raises(RuntimeError):
+        run.submit(run.challenge.answers[-1])
+
+
+def test_simulated_bots_commit_every_session(tmp_path):
+    store = LeaderboardStore(str(tmp_path / 'bots.db'))
+    store.setup()
+    writer = ScoreWriter(store, batch_size=16)
+    try:
+        report = asyncio.run(simulate(writer, bots=8, sessions=40, latency=0, error_rate=0.3, seed=2))
+    finally:
+        writer.close()
+    try:
+        assert report["sessions"] == 40
+        assert report["write_errors"] == 0
+        assert report["mistakes"] > 0
+        assert store.count() == 40
+    finally:
+        store.close()
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture
+def trace():
+    tracing.reset()
+    tracing.enable()
+    yield tracing
+    tracing.disable()
+    tracing.reset()
+
+
+def test_disabled_tracing_records_nothing():
+    tracing.reset()
+    assert not tracing.enabled
+    first = tracing.span("keygen", bits=64)
+    assert first is tracing.span("encrypt") is tracing._NULL_SPAN
+    with first as span:
+        span.set(valid=True)
+    tracing.event("clicked")
+    tracing.count("encrypt.values", 10)
+    assert tracing.summary() == {'spans': {}, 'counters': {}}
+
+
+def test_chrome_trace_export(trace, tmp_path):
+    with trace.span("keygen", bits=64) as span:
+        span.set(valid=True)
+    trace.event("stage", number=2)
+    trace.count("encrypt.values", 3)
+    trace.count("encrypt.values", 4)
+    path = tmp_path / 'trace.json'
+    trace.export(str(path))
+    events = json.loads(path.read_text())['traceEvents']
+    by_phase = {}
+    for record in events:
+        by_phase.setdefault(record['ph'], []).append(record)
+    [keygen] = by_phase['X']
+    assert keygen['name'] == "keygen" and keygen['args'] == {'bits': 64, 'valid': True}
+    assert keygen['dur'] >= 0
+    assert [r['name'] for r in by_phase['i']] == ["stage"]
+    assert [r['args'] for r in by_phase['C']] == [{'encrypt.values': 7}]
+
+
+def test_json_summary_export(trace, tmp_path):
+    for _ in range(3):
+        with trace.span("decrypt"):
+            pass
+    with pytest.raises(KeyError):
+        with trace.span("encrypt"):
+            raise KeyError("boom")
+    path = tmp_path / 'summary.json'
+    trace.export(str(path), 'json')
+    data = json.loads(path.read_text())
+    assert {name: stats['count'] for name, stats in data['spans'].items()} == {"decrypt": 3, "encrypt": 1}
+    assert data['spans']['decrypt']['max_ms'] >= data['spans']['decrypt']['mean_ms']
+    assert data['events'][-1]['args'] == {'error': 'KeyError'}
+
+
+def test_unknown_format_is_rejected(trace, tmp_path):
+    with pytest.raises(ValueError):
+        trace.export(str(tmp_path / 'trace.txt'), 'text')
+    assert not (tmp_path / 'trace.txt').exists()
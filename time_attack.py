@@ -0,0 +1,77 @@
+"""Time Attack game rules without any UI.
+
+A TimeAttackSession walks one player through the three questions for a
+challenge and times them. TimeAttackGame drives one from the GUI, and
+bot_simulator drives thousands at once; both record results through the
+same ScoreWriter path.
+"""
+import time
+
+from challenges import challenge_pool
+from leaderboard import score_writer
+
+QUESTIONS = (
+    "If p = {p} and q = {q}, find n (n = p * q):",
+    "Find e such that 1 < e < φ(n) and gcd(e, φ(n)) = 1. (φ(n) = {phi})",
+    "Find d such that d = e⁻¹ mod φ(n). (e = {e}, φ(n) = {phi})",
+)
+
+# submit() results
+CORRECT = 'correct'
+INCORRECT = 'incorrect'
+FINISHED = 'finished'
+
+
+class TimeAttackSession:
+    """One timed run through a challenge's questions
+
+    The clock starts when the session is created. Pass a challenge to replay
+    a known one; otherwise a fresh one is taken from the shared pool.
+    """
+
+    def __init__(self, player_name, difficulty, challenge=None, clock=time.monotonic):
+        self.player_name = player_name
+        self.difficulty = difficulty
+        self.challenge = challenge or challenge_pool().take(difficulty)
+        self.clock = clock
+        self.question_index = 0
+        self.mistakes = 0
+        self.started = clock()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    @property
+    def question(self):
+        return QUESTIONS[self.question_index].format(**self.challenge._asdict())
+
+    def submit(self, answer):
+        """Check an answer to the current question; returns CORRECT, INCORRECT or FINISHED"""
+        if self.finished:
+            raise RuntimeError("Session is already finished")
+        if answer != self.challenge.answers[self.question_index]:
+            self.mistakes += 1
+            return INCORRECT
+        self.question_index += 1
+        if self.question_index < len(QUESTIONS):
+            return CORRECT
+        self.finished_at = self.clock()
+        return FINISHED
+
+    def elapsed(self):
+        """Seconds since the start, frozen once finished"""
+        return (self.finished_at if self.finished else self.clock()) - self.started
+
+    @property
+    def time_taken(self):
+        """Whole seconds, as recorded on the leaderboard"""
+        return int(self.elapsed())
+
+    def save_score(self, writer=None, callback=None):
+        """Queue the finished run's score; callback(score, error) follows the commit"""
+        if not self.finished:
+            raise RuntimeError("Only a finished session has a score")
+        (writer or score_writer()).submit(self.player_name, self.difficulty, self.time_taken,
+                                          callback=callback)
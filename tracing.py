@@ -0,0 +1,237 @@
+"""Opt-in tracing and profiling for the game and its engines.
+
+Tracing is off unless RSA_TRACE names an output file. While it is off,
+span() hands back one shared do-nothing context manager, and event() and
+count() return after a single flag check. Call sites pass only values they
+already have (no formatting or list building), so leaving the hooks in hot
+paths costs nothing measurable.
+
+    RSA_TRACE=trace.json python rsa.py                      # Chrome trace (chrome://tracing, Perfetto)
+    RSA_TRACE=trace.json RSA_TRACE_FORMAT=json python rsa.py # span/counter summary plus raw events
+    RSA_PROFILE=game.prof python rsa.py                     # cProfile capture, read with pstats
+
+Outputs are written at interpreter exit.
+"""
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+
+TRACE_ENV = 'RSA_TRACE'
+TRACE_FORMAT_ENV = 'RSA_TRACE_FORMAT'
+PROFILE_ENV = 'RSA_PROFILE'
+FORMATS = ('chrome', 'json')
+
+enabled = False
+
+_events = []  # (name, start, duration, thread id, args); duration None for instant events
+_counters = {}
+_lock = threading.Lock()
+_origin = time.perf_counter()
+_profiler = None
+_thread_profiles = []  # finished per-thread captures, merged into the dump
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        _events.append((self.name, self.start, end - self.start, threading.get_ident(), self.args))
+        return False
+
+    def set(self, **args):
+        """Attach results known only once the span's work is done"""
+        self.args.update(args)
+
+
+def span(name, **args):
+    """Time a block: `with span("keygen", bits=n): ...`"""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def event(name, **args):
+    """Record an instant event"""
+    if enabled:
+        _events.append((name, time.perf_counter(), None, threading.get_ident(), args))
+
+
+def count(name, value=1):
+    """Add value to a named counter"""
+    if enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _counters.clear()
+
+
+def summary():
+    """Per-span count and timings (ms) plus the counters"""
+    spans = {}
+    for name, _, duration, _, _ in list(_events):
+        if duration is None:
+            continue
+        stats = spans.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stats['count'] += 1
+        stats['total_ms'] += duration * 1e3
+        stats['max_ms'] = max(stats['max_ms'], duration * 1e3)
+    for stats in spans.values():
+        stats['mean_ms'] = stats['total_ms'] / stats['count']
+    with _lock:
+        counters = dict(_counters)
+    return {'spans': spans, 'counters': counters}
+
+
+def _us(seconds):
+    return round(seconds * 1e6, 3)
+
+
+def chrome_trace():
+    """The recorded events in Chrome's Trace Event format"""
+    pid = os.getpid()
+    trace = []
+    for name, start, duration, tid, args in list(_events):
+        record = {'name': name, 'ts': _us(start - _origin), 'pid': pid, 'tid': tid, 'args': args}
+        if duration is None:
+            record.update(ph='i', s='t')
+        else:
+            record.update(ph='X', dur=_us(duration))
+        trace.append(record)
+    end = _us(time.perf_counter() - _origin)
+    with _lock:
+        for name, value in _counters.items():
+            trace.append({'name': name, 'ph': 'C', 'ts': end, 'pid': pid, 'args': {name: value}})
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+
+def export(path, fmt='chrome'):
+    """Write the trace to path as a Chrome trace or a JSON summary"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown trace format {fmt!r}")
+    if fmt == 'chrome':
+        data = chrome_trace()
+    else:
+        data = summary()
+        data['events'] = [{'name': name, 'start_ms': (start - _origin) * 1e3,
+                           'duration_ms': None if duration is None else duration * 1e3,
+                           'thread': tid, 'args': args}
+                          for name, start, duration, tid, args in list(_events)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, default=str)
+
+
+def start_profile():
+    """Start a cProfile capture of the calling thread"""
+    global _profiler
+    if _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+class _ThreadProfile:
+    __slots__ = ('profile',)
+
+    def __enter__(self):
+        self.profile = cProfile.Profile()
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from the one capture, and
+            # refuses a second profiler while it runs
+            self.profile = None
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.disable()
+            with _lock:
+                _thread_profiles.append(self.profile)
+        return False
+
+
+def profile_thread():
+    """Profile a block on a worker thread into the running capture
+
+    cProfile.Profile.enable() only hooks the calling thread (before 3.12), so
+    pool threads wrap their work in this; stop_profile merges the results.
+    """
+    if _profiler is None:
+        return _NULL_SPAN
+    return _ThreadProfile()
+
+
+def stop_profile(path):
+    """Stop the capture and dump pstats-readable stats, worker threads included, to path"""
+    global _profiler
+    if _profiler is not None:
+        _profiler.disable()
+        stats = pstats.Stats(_profiler)
+        with _lock:
+            if _thread_profiles:
+                stats.add(*_thread_profiles)
+            _thread_profiles.clear()
+        stats.dump_stats(path)
+        _profiler = None
+
+
+def configure_from_env():
+    """Enable tracing and profiling as requested by the environment"""
+    trace_path = os.environ.get(TRACE_ENV)
+    if trace_path:
+        enable()
+        fmt = os.environ.get(TRACE_FORMAT_ENV, 'chrome')
+        if fmt not in FORMATS:
+            raise ValueError(f"{TRACE_FORMAT_ENV} must be one of {', '.join(FORMATS)}")
+        atexit.register(export, trace_path, fmt)
+    profile_path = os.environ.get(PROFILE_ENV)
+    if profile_path:
+        start_profile()
+        atexit.register(stop_profile, profile_path)
+
+
+configure_from_env()